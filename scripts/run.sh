@@ -1,4 +1,4 @@
 #!/bin/bash
 # Activate virtual environment and run the migration script
 source venv/bin/activate
-python src/spotify_to_ytmusic.py
+python src/spotify_to_ytmusic.py "$@"
@@ -0,0 +1,211 @@
+"""
+Batch mode: migrates several accounts concurrently from a JSON manifest.
+
+Each account runs in a fresh worker process, inside its own directory,
+so its credentials, Spotify token cache, migration state, rate limiters
+and reports stay separate. Console output of an account goes to a log
+file in its directory; the batch itself prints one line per finished
+account and a summary table.
+
+Manifest format:
+
+    {
+      "max_parallel": 4,
+      "defaults": {"SEARCH_WORKERS": 2},
+      "accounts": [
+        {
+          "name": "alice",
+          "dir": "accounts/alice",
+          "env_file": ".env",
+          "ytmusic_auth_file": "headers.json",
+          "state_file": ".migration_state.db",
+          "config": {"SEARCH_RATE_PER_SECOND": 1.0}
+        }
+      ]
+    }
+
+`dir` and `SHARED_MATCH_DB` are relative to the manifest; the other
+paths are relative to `dir`.
+`defaults` and `config` override module constants of spotify_to_ytmusic.py
+for every account and for one account respectively.
+"""
+import json
+import multiprocessing
+import os
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+ACCOUNT_LOG_FILE = "migration.log"
+
+# Manifest keys that map onto module constants
+PATH_SETTINGS = {
+    "ytmusic_auth_file": "YTMUSIC_AUTH_FILE",
+    "state_file": "STATE_FILE",
+}
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def load_manifest(path: str) -> dict:
+    """Reads and validates a batch manifest. Account dirs are made absolute."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ManifestError(f"Could not read manifest {path}: {e}")
+
+    accounts = manifest.get("accounts")
+    if not isinstance(accounts, list) or not accounts:
+        raise ManifestError("Manifest must contain a non-empty 'accounts' list")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get("defaults") or {}
+    names = set()
+    for i, account in enumerate(accounts):
+        if not isinstance(account, dict) or not account.get("dir"):
+            raise ManifestError(f"Account #{i + 1} needs a 'dir'")
+        account["dir"] = os.path.normpath(os.path.join(base_dir, account["dir"]))
+        if not os.path.isdir(account["dir"]):
+            raise ManifestError(f"Account directory not found: {account['dir']}")
+        account.setdefault("name", os.path.basename(account["dir"]))
+        if account["name"] in names:
+            raise ManifestError(f"Duplicate account name '{account['name']}'")
+        names.add(account["name"])
+        account["config"] = {**defaults, **(account.get("config") or {})}
+        # One shared match store for the whole batch, not one per account dir
+        shared_db = account["config"].get("SHARED_MATCH_DB")
+        if shared_db:
+            account["config"]["SHARED_MATCH_DB"] = os.path.join(base_dir, shared_db)
+    return manifest
+
+
+def _apply_config(migrator, account: dict):
+    overrides = dict(account["config"])
+    for key, constant in PATH_SETTINGS.items():
+        if account.get(key):
+            overrides[constant] = account[key]
+    for name, value in overrides.items():
+        if not name.isupper() or not hasattr(migrator, name):
+            raise ManifestError(f"Unknown setting '{name}' for account '{account['name']}'")
+        setattr(migrator, name, value)
+    # Rate limiters are built from the config, so rebuild them after overrides
+    migrator.reset_rate_limiters()
+
+
+def _summarize(report_path: Optional[str]) -> dict:
+    """Per-account numbers for the batch summary, from the account's run report."""
+    summary = {"tracks": 0, "added": 0, "missing": 0, "calls": 0, "throttles": 0}
+    if not report_path:
+        return summary
+    try:
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return summary
+    counters = report.get("counters", {})
+    summary.update({
+        "tracks": counters.get("tracks_processed", 0),
+        "added": counters.get("tracks_added", 0),
+        "missing": counters.get("tracks_missing", 0),
+        "calls": report.get("totals", {}).get("calls", 0),
+        "throttles": report.get("totals", {}).get("throttles", 0),
+    })
+    return summary
+
+
+def run_account(account: dict) -> dict:
+    """
+    Migrates one account. Runs in a worker process: the process-wide state
+    of spotify_to_ytmusic (config, limiters, metrics) belongs to this
+    account alone.
+    """
+    start = time.monotonic()
+    result = {"name": account["name"], "ok": False, "error": None}
+    os.chdir(account["dir"])
+    log_path = os.path.join(account["dir"], account.get("log_file") or ACCOUNT_LOG_FILE)
+    result["log"] = log_path
+
+    with open(log_path, "a", encoding="utf-8", buffering=1) as log, \
+            redirect_stdout(log), redirect_stderr(log):
+        try:
+            env_file = account.get("env_file", ".env")
+            if env_file:
+                if os.path.exists(env_file):
+                    load_dotenv(env_file, override=True)
+                elif "env_file" in account:
+                    raise FileNotFoundError(f"env file not found: {env_file}")
+
+            import spotify_to_ytmusic as migrator
+            _apply_config(migrator, account)
+            print(f"===== Batch run for account '{account['name']}' =====")
+            migrator.main(retry_failed=account.get("retry_failed", False))
+            result["ok"] = True
+            report_file = migrator.RUN_REPORT_FILE
+        except BaseException as e:  # Includes SystemExit from the migrator
+            traceback.print_exc()
+            result["error"] = f"{type(e).__name__}: {e}"
+            report_file = None
+
+    result["seconds"] = round(time.monotonic() - start, 1)
+    result.update(_summarize(report_file))
+    return result
+
+
+def run_batch(manifest_path: str, max_parallel: Optional[int] = None,
+              default_max_parallel: int = 4, retry_failed: bool = False) -> int:
+    """
+    Migrates every account in the manifest, at most `max_parallel` at a
+    time (falling back to the manifest's `max_parallel`, then
+    `default_max_parallel`). With `retry_failed`, each account only
+    retries its failed songs. Returns a process exit code.
+    """
+    try:
+        manifest = load_manifest(manifest_path)
+    except ManifestError as e:
+        print(f"❌ {e}")
+        return 2
+
+    accounts: List[dict] = manifest["accounts"]
+    for account in accounts:
+        account["retry_failed"] = retry_failed
+    workers = max(1, min(len(accounts),
+                         max_parallel or manifest.get("max_parallel") or default_max_parallel))
+    print(f"=== Batch migration: {len(accounts)} accounts, {workers} at a time ===")
+    for account in accounts:
+        print(f"  • {account['name']}: {account['dir']}")
+
+    start = time.monotonic()
+    results: Dict[str, dict] = {}
+    # One fresh process per account (maxtasksperchild=1), so no config,
+    # limiter or environment variable carries over between accounts
+    with multiprocessing.Pool(processes=workers, maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(run_account, accounts):
+            results[result["name"]] = result
+            if result["ok"]:
+                print(f"  ✓ {result['name']}: {result['tracks']} tracks in {result['seconds']:.1f}s "
+                      f"(added {result['added']}, missing {result['missing']})")
+            else:
+                print(f"  ✗ {result['name']}: {result['error']} (see {result.get('log', ACCOUNT_LOG_FILE)})")
+    elapsed = time.monotonic() - start
+
+    print("\n" + "=" * 70)
+    print("Batch complete!")
+    print(f"  {'Account':<20} {'Status':<7} {'Tracks':>8} {'Added':>8} {'Missing':>8} {'Calls':>8} {'Time':>8}")
+    for account in accounts:
+        r = results[account["name"]]
+        print(f"  {r['name'][:20]:<20} {'ok' if r['ok'] else 'FAILED':<7} {r['tracks']:>8} {r['added']:>8} "
+              f"{r['missing']:>8} {r['calls']:>8} {r['seconds']:>7.1f}s")
+    total_tracks = sum(r["tracks"] for r in results.values())
+    failed = sum(1 for r in results.values() if not r["ok"])
+    print(f"  Fleet throughput: {total_tracks / elapsed if elapsed else 0:.1f} tracks/s "
+          f"({total_tracks} tracks in {elapsed:.0f}s)")
+    if failed:
+        print(f"  Failed accounts: {failed}")
+    print("=" * 70)
+    return 1 if failed else 0
@@ -0,0 +1,241 @@
+"""
+Multi-index cache of Spotify → YouTube Music matches.
+
+A track is looked up by Spotify id first, then by ISRC (the same recording
+released as a single and on an album, or a relinked track id), and finally
+by its normalized title/artist key. Each index is a dict in memory backed
+by an indexed column in the state database, so every tier is O(1).
+With a shared match store, matches found by other migrations on the same
+machine are the last tier before searching.
+
+Cached misses expire: "no_results" after a long TTL (the song may be
+uploaded later), "api_error" after a short one (the search never really
+happened). Expired misses are ignored, so the track is searched again.
+
+Concurrent misses for the same key are coalesced: the first worker
+searches, the others wait for it and share its result.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from shared_store import SharedMatchStore
+from state_store import MigrationStateStore
+
+
+INDEXES = ("spotify_id", "isrc", "key", "shared")
+
+MISS_REASONS = ("no_results", "api_error")
+DEFAULT_MISS_TTLS = {"no_results": timedelta(days=30), "api_error": timedelta(hours=6)}
+
+_MISSING = object()
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, callers arriving while it runs wait for it and get the same
+    result (or exception). Nothing is kept once the call returns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.coalesced = 0  # Calls answered by another caller's run
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Returns (result, shared); `shared` is True if another caller ran `fn`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+
+class MatchCache:
+    """
+    In-memory match cache in front of the persistent song cache.
+
+    Values are a videoId, or None for a cached "not found". Results found
+    through one index are remembered under all of the track's identifiers,
+    so the next lookup for the same track hits on the first tier.
+    """
+
+    def __init__(self, store: MigrationStateStore, shared: Optional[SharedMatchStore] = None,
+                 miss_ttls: Optional[Dict[str, timedelta]] = None):
+        self.store = store
+        self.shared = shared
+        self.miss_ttls = dict(DEFAULT_MISS_TTLS, **(miss_ttls or {}))
+        self.expired = 0
+        self._by_spotify_id: Dict[str, Optional[str]] = {}
+        self._by_isrc: Dict[str, Optional[str]] = {}
+        self._by_key: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {name: 0 for name in INDEXES}
+        self.misses = 0
+        self.inflight = SingleFlight()  # Searches in progress, by key
+
+    def _remember(self, spotify_id: Optional[str], isrc: Optional[str], key: str,
+                  video_id: Optional[str]):
+        with self._lock:
+            if spotify_id:
+                self._by_spotify_id[spotify_id] = video_id
+            if isrc:
+                self._by_isrc[isrc] = video_id
+            self._by_key[key] = video_id
+
+    def remember(self, spotify_id: Optional[str], isrc: Optional[str], key: str,
+                 video_id: Optional[str]):
+        """Records a result found for another track with the same key, in memory only."""
+        self._remember(spotify_id, isrc, key, video_id)
+
+    def peek(self, key: str) -> Optional[dict]:
+        """
+        This run's in-memory result for a title/artist key ({"videoId",
+        "found"}), or None. Not counted as a lookup.
+        """
+        video_id = self._by_key.get(key, _MISSING)
+        if video_id is _MISSING:
+            return None
+        return {"videoId": video_id, "found": video_id is not None}
+
+    def miss_expires_at(self, reason: str, searched_at: Optional[datetime] = None) -> str:
+        ttl = self.miss_ttls.get(reason, self.miss_ttls["api_error"])
+        return ((searched_at or datetime.now()) + ttl).isoformat()
+
+    def is_expired(self, entry: dict, now: Optional[datetime] = None) -> bool:
+        """True for a stored miss that should be searched again."""
+        if entry["found"]:
+            return False
+        expires_at = entry.get("expires_at")
+        if not expires_at:
+            # Misses cached before expiry was tracked: treat them as "no_results"
+            if not entry.get("last_searched"):
+                return True
+            expires_at = self.miss_expires_at("no_results", datetime.fromisoformat(entry["last_searched"]))
+        return datetime.fromisoformat(expires_at) <= (now or datetime.now())
+
+    def _find(self, spotify_id: Optional[str], isrc: Optional[str], key: str):
+        """Returns (index name, entry, from_store) or (None, None, False)."""
+        memory = (
+            ("spotify_id", self._by_spotify_id, spotify_id),
+            ("isrc", self._by_isrc, isrc),
+            ("key", self._by_key, key),
+        )
+        for name, index, value in memory:
+            if value:
+                video_id = index.get(value, _MISSING)
+                if video_id is not _MISSING:
+                    return name, {"videoId": video_id, "found": video_id is not None}, False
+
+        stored = (
+            ("spotify_id", self.store.get_song_by_spotify_id, spotify_id),
+            ("isrc", self.store.get_song_by_isrc, isrc),
+            ("key", self.store.get_song, key),
+        )
+        local_miss = None
+        for name, lookup, value in stored:
+            if value:
+                entry = lookup(value)
+                if entry is not None:
+                    if self.is_expired(entry):
+                        with self._lock:
+                            self.expired += 1
+                        continue
+                    if entry["found"] or self.shared is None:
+                        return name, entry, True
+                    local_miss = (name, entry, True)
+                    break
+
+        # Another migration may have found what this one could not
+        if self.shared is not None:
+            video_id = self.shared.get(spotify_id, isrc)
+            if video_id:
+                return "shared", {"videoId": video_id, "found": True}, True
+        return local_miss or (None, None, False)
+
+    def lookup(self, spotify_id: Optional[str], isrc: Optional[str], key: str,
+               count: bool = True) -> Optional[dict]:
+        """
+        Returns the cached entry ({"videoId", "found", "from_store", "shared"})
+        for a track, or None on a miss. Counts towards the hit rate unless
+        `count` is False, e.g. for a track this run already looked up.
+        """
+        name, entry, from_store = self._find(spotify_id, isrc, key)
+        if entry is None:
+            if count:
+                with self._lock:
+                    self.misses += 1
+            return None
+        if count:
+            with self._lock:
+                self.hits[name] += 1
+        video_id = entry["videoId"] if entry["found"] else None
+        self._remember(spotify_id, isrc, key, video_id)
+        if name == "shared":
+            # Keep a local copy so later runs do not depend on the shared store
+            self.store.put_song(key, video_id, spotify_id=spotify_id, attempts=0, isrc=isrc)
+        return {"videoId": video_id, "found": video_id is not None, "from_store": from_store,
+                "shared": name == "shared"}
+
+    def contains(self, spotify_id: Optional[str], isrc: Optional[str], key: str) -> bool:
+        """Like lookup() but without touching the statistics."""
+        return self._find(spotify_id, isrc, key)[1] is not None
+
+    def store_result(self, spotify_id: Optional[str], isrc: Optional[str], key: str,
+                     video_id: Optional[str], attempts: int = 1, miss_reason: Optional[str] = None):
+        """
+        Records a fresh search result in memory and in the state database.
+        Misses get an expiry from their reason ("no_results" or "api_error").
+        Matches are also published to the shared store.
+        """
+        self._remember(spotify_id, isrc, key, video_id)
+        expires_at = None
+        if video_id is None:
+            miss_reason = miss_reason or "no_results"
+            expires_at = self.miss_expires_at(miss_reason)
+        self.store.put_song(key, video_id, spotify_id=spotify_id, attempts=attempts, isrc=isrc,
+                            miss_reason=miss_reason, expires_at=expires_at)
+        if self.shared is not None and video_id:
+            self.shared.put(spotify_id, video_id, isrc)
+
+    @property
+    def lookups(self) -> int:
+        return sum(self.hits.values()) + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return sum(self.hits.values()) / self.lookups if self.lookups else 0.0
+
+    def summary(self) -> str:
+        by_index = ", ".join(f"{name} {count}" for name, count in self.hits.items())
+        return (f"{self.hit_rate:.1%} of {self.lookups} lookups ({by_index}; misses {self.misses}, "
+                f"{self.inflight.coalesced} shared with a concurrent search)")
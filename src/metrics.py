@@ -0,0 +1,299 @@
+"""
+Run metrics: per-endpoint call counts, latency histograms, retries,
+throttles and time spent sleeping, written out as a JSON run report and
+optionally a Prometheus textfile.
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_PREFIX = "spotify_to_ytmusic"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (not thread-safe; Metrics holds the lock)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (max for +Inf)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_seconds": round(self.sum, 6),
+            "mean_seconds": round(self.sum / self.count, 6) if self.count else None,
+            "max_seconds": round(self.max, 6),
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "p99_seconds": self.quantile(0.99),
+            "buckets": {str(b): n for b, n in zip(list(self.buckets) + ["+Inf"], self.counts)},
+        }
+
+
+class _EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.throttles = 0
+        self.retries = 0
+        self.latency = Histogram()
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "throttles": self.throttles,
+            "retries": self.retries,
+            "latency": self.latency.to_dict(),
+        }
+
+
+class Metrics:
+    """
+    Thread-safe collector shared by every worker.
+
+    `is_throttle` classifies exceptions raised by timed calls; matching
+    errors are counted as throttle events as well as errors.
+    """
+
+    def __init__(self, is_throttle: Optional[Callable[[Exception], bool]] = None):
+        self.is_throttle = is_throttle
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears all measurements and restarts the run clock."""
+        with self._lock:
+            self.started_at = datetime.now()
+            self._start = time.monotonic()
+            self._endpoints: Dict[str, _EndpointStats] = {}
+            self._sleeps: Dict[str, List[float]] = {}  # reason -> [count, seconds]
+            self._counters: Counter = Counter()
+
+    def _endpoint(self, endpoint: str) -> _EndpointStats:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = _EndpointStats()
+        return stats
+
+    @contextmanager
+    def timed(self, endpoint: str) -> Iterator[None]:
+        """Times one external call and records its outcome."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            throttled = bool(self.is_throttle and self.is_throttle(e))
+            with self._lock:
+                stats = self._endpoint(endpoint)
+                stats.calls += 1
+                stats.errors += 1
+                stats.throttles += throttled
+                stats.latency.observe(elapsed)
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats.calls += 1
+            stats.latency.observe(elapsed)
+
+    def record_retry(self, endpoint: str):
+        with self._lock:
+            self._endpoint(endpoint).retries += 1
+
+    def record_sleep(self, reason: str, seconds: float, count: int = 1):
+        with self._lock:
+            entry = self._sleeps.setdefault(reason, [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+
+    def sleep(self, reason: str, seconds: float):
+        """time.sleep() that is accounted for in the report."""
+        time.sleep(seconds)
+        self.record_sleep(reason, seconds)
+
+    def incr(self, counter: str, n: int = 1):
+        with self._lock:
+            self._counters[counter] += n
+
+    def calls(self, prefix: str = "") -> int:
+        """Calls made so far to endpoints starting with `prefix` (e.g. "yt.")."""
+        with self._lock:
+            return sum(stats.calls for name, stats in self._endpoints.items() if name.startswith(prefix))
+
+    def instrument(self, client, prefix: str):
+        """Wraps an API client so each method call is timed as `<prefix>.<method>`."""
+        return InstrumentedClient(client, self, prefix)
+
+    # ----- REPORTING -----
+
+    def snapshot(self, limiters: Optional[Dict[str, object]] = None, extra: Optional[dict] = None) -> dict:
+        """
+        Returns the run report as a dict. Time spent waiting on `limiters`
+        (TokenBucket instances) is included under `sleeps` as
+        `rate_limiter.<name>`.
+        """
+        duration = time.monotonic() - self._start
+        with self._lock:
+            endpoints = {name: stats.to_dict() for name, stats in sorted(self._endpoints.items())}
+            sleeps = {reason: {"count": n, "seconds": round(s, 3)} for reason, (n, s) in self._sleeps.items()}
+            counters = dict(self._counters)
+
+        rate_limiters = {}
+        for name, limiter in (limiters or {}).items():
+            rate_limiters[name] = {
+                "rate": round(limiter.rate, 3),
+                "throttles": getattr(limiter, "throttle_count", 0),
+                "waits": limiter.waits,
+                "wait_seconds": round(limiter.wait_seconds, 3),
+            }
+            sleeps[f"rate_limiter.{name}"] = {"count": limiter.waits, "seconds": round(limiter.wait_seconds, 3)}
+
+        report = {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now().isoformat(),
+            "duration_seconds": round(duration, 3),
+            "totals": {
+                "calls": sum(e["calls"] for e in endpoints.values()),
+                "errors": sum(e["errors"] for e in endpoints.values()),
+                "throttles": sum(e["throttles"] for e in endpoints.values()),
+                "retries": sum(e["retries"] for e in endpoints.values()),
+                "sleep_seconds": round(sum(s["seconds"] for s in sleeps.values()), 3),
+            },
+            "throughput": {
+                name: round(n / duration, 3) if duration else None
+                for name, n in counters.items()
+            },
+            "counters": counters,
+            "endpoints": endpoints,
+            "sleeps": sleeps,
+            "rate_limiters": rate_limiters,
+        }
+        if extra:
+            report.update(extra)
+        return report
+
+
+def _write_atomic(path: str, text: str):
+    # Readers (and the node_exporter textfile collector) never see a partial file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json_report(path: str, report: dict):
+    _write_atomic(path, json.dumps(report, indent=2) + "\n")
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(report: dict, prefix: str = PROMETHEUS_PREFIX) -> str:
+    """Renders a run report in the Prometheus text exposition format."""
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        for suffix, labels, value in samples:
+            label_str = ",".join(f'{k}="{_label(str(v))}"' for k, v in labels.items())
+            lines.append(f"{prefix}_{name}{suffix}{{{label_str}}} {value}" if label_str
+                         else f"{prefix}_{name}{suffix} {value}")
+
+    endpoints = report["endpoints"]
+    for field, help_text in (
+        ("calls", "External API calls."),
+        ("errors", "External API calls that raised."),
+        ("throttles", "Calls rejected by rate limiting."),
+        ("retries", "Calls retried after a failure."),
+    ):
+        metric(f"api_{field}_total", "counter", help_text,
+               [("", {"endpoint": name}, e[field]) for name, e in endpoints.items()])
+
+    samples = []
+    for name, e in endpoints.items():
+        cumulative = 0
+        for bound, n in e["latency"]["buckets"].items():
+            cumulative += n
+            samples.append(("_bucket", {"endpoint": name, "le": bound}, cumulative))
+        samples.append(("_sum", {"endpoint": name}, e["latency"]["sum_seconds"]))
+        samples.append(("_count", {"endpoint": name}, e["latency"]["count"]))
+    metric("api_latency_seconds", "histogram", "External API call latency.", samples)
+
+    metric("sleep_seconds_total", "counter", "Time spent sleeping on purpose.",
+           [("", {"reason": reason}, s["seconds"]) for reason, s in report["sleeps"].items()])
+    metric("rate_limit_requests_per_second", "gauge", "Current rate of each adaptive limiter.",
+           [("", {"limiter": name}, lim["rate"]) for name, lim in report["rate_limiters"].items()])
+    metric("events_total", "counter", "Pipeline events (tracks resolved, added, missing, ...).",
+           [("", {"event": name}, n) for name, n in report["counters"].items()])
+    metric("run_duration_seconds", "gauge", "Wall-clock duration of the run.",
+           [("", {}, report["duration_seconds"])])
+    metric("run_finished_timestamp_seconds", "gauge", "Unix time the run finished.",
+           [("", {}, round(time.time(), 3))])
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path: str, report: dict):
+    _write_atomic(path, render_prometheus(report))
+
+
+class InstrumentedClient:
+    """
+    Transparent proxy around a spotipy or ytmusicapi client. Every method
+    call goes through Metrics.timed(); attributes are passed through.
+    """
+
+    def __init__(self, client, metrics: Metrics, prefix: str):
+        self._client = client
+        self._metrics = metrics
+        self._prefix = prefix
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        endpoint = f"{self._prefix}.{name}"
+        metrics = self._metrics
+
+        def call(*args, **kwargs):
+            with metrics.timed(endpoint):
+                return attr(*args, **kwargs)
+
+        return call
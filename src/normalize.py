@@ -0,0 +1,99 @@
+"""
+Canonical track titles and artist names.
+
+Spotify lists one recording under many titles: "Song - Remastered 2011",
+"Song (feat. X)", "Song - Radio Edit", "Sóng". Lowercasing alone gives
+each of them its own cache key, so each was searched separately.
+`canonical_key()` folds title and artists into one key per recording:
+version tags and feat. clauses are stripped, diacritics and punctuation
+removed, and artists sorted, with featured artists dropped when the
+title names them. `search_query()` builds the YouTube Music query from
+the same cleaned title, so version tags do not skew the results.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, List, Sequence, Tuple
+
+# Tags marking another release of the same recording. They only count in a
+# trailing " - ..." part or in brackets, so "Live and Let Die" is kept.
+# Bare "edit" and "mix" are left alone: a club edit or extended mix is a
+# different recording.
+_VERSION_TAG = re.compile(
+    r"\b(?:re-?master(?:ed)?|(?:radio|single|album|clean|explicit|original) (?:edit|version|mix)"
+    r"|live|mono|stereo|deluxe|bonus track|(?:\w+ )?edition|\d{4} mix)\b",
+    re.IGNORECASE,
+)
+_FEAT = r"(?:feat\.?|ft\.?|featuring|with)"
+_BRACKETED = re.compile(r"\s*[(\[]([^()\[\]]*)[)\]]")
+_TRAILING = re.compile(r"\s+-\s+([^-]*)$")
+_BRACKETED_FEAT = re.compile(rf"^\s*{_FEAT}\s+(.+)$", re.IGNORECASE)
+_BARE_FEAT = re.compile(r"\s+(?:feat\.?|ft\.?|featuring)\s+(.+)$", re.IGNORECASE)
+_NAME_SEPARATORS = re.compile(r"\s*(?:,|&|\band\b)\s*", re.IGNORECASE)
+_APOSTROPHES = re.compile(r"['\u2018\u2019`]")
+# "?" and "!" are kept: "Hello?" and "Hello!" are different songs
+_NON_WORD = re.compile(r"[^\w?!]+|_+")
+
+
+def split_title(title: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Strips version tags and feat. clauses from a title.
+    Returns (clean title, featured artist names), e.g.
+    "Song (feat. A & B) - Remastered 2011" -> ("Song", ("A", "B")).
+    """
+    featured: List[str] = []
+
+    def bracket(match: "re.Match") -> str:
+        inner = match.group(1)
+        feat = _BRACKETED_FEAT.match(inner)
+        if feat:
+            featured.extend(_NAME_SEPARATORS.split(feat.group(1)))
+            return ""
+        return "" if _VERSION_TAG.search(inner) else match.group(0)
+
+    clean = _BRACKETED.sub(bracket, title)
+    while True:
+        trailing = _TRAILING.search(clean)
+        if not trailing or not _VERSION_TAG.search(trailing.group(1)):
+            break
+        clean = clean[:trailing.start()]
+    feat = _BARE_FEAT.search(clean)
+    if feat:
+        featured.extend(_NAME_SEPARATORS.split(feat.group(1)))
+        clean = clean[:feat.start()]
+    clean = clean.strip()
+    # A title that is nothing but tags is kept as it is
+    return (clean or title.strip()), tuple(name.strip() for name in featured if name.strip())
+
+
+@lru_cache(maxsize=65536)
+def fold(text: str) -> str:
+    """Lowercase ASCII-ish form: no diacritics, punctuation other than ?/! or repeated spaces."""
+    decomposed = unicodedata.normalize("NFKD", text.replace("&", " and "))
+    stripped = _APOSTROPHES.sub("", "".join(c for c in decomposed if not unicodedata.combining(c)))
+    folded = " ".join(_NON_WORD.sub(" ", stripped.casefold()).split())
+    # Titles made only of punctuation or symbols keep their own identity
+    return folded or text.strip().casefold()
+
+
+def canonical_title(title: str) -> str:
+    return fold(split_title(title)[0])
+
+
+def canonical_artists(artists: Iterable[str], featured: Sequence[str] = ()) -> str:
+    """Sorted, folded artist names, leaving out the ones in `featured`."""
+    names = {fold(a) for a in artists if a}
+    dropped = names - {fold(f) for f in featured}
+    return ", ".join(sorted(dropped or names))
+
+
+def canonical_key(title: str, artists: Sequence[str]) -> str:
+    """One cache key per recording, e.g. "song title||artist a, artist b"."""
+    clean, featured = split_title(title)
+    return f"{fold(clean)}||{canonical_artists(artists, featured)}"
+
+
+def search_query(title: str, artists: Sequence[str], album: str = "") -> str:
+    """YouTube Music query: title and album without version tags, plus every artist."""
+    clean_album = split_title(album)[0] if album else ""
+    return f"{split_title(title)[0]} {', '.join(artists)} {clean_album}".strip()
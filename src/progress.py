@@ -0,0 +1,166 @@
+"""
+Console progress for long migrations.
+
+Per-track results are counted instead of printed, and a one-line summary
+is redrawn at a fixed rate. Per-track detail is still available through
+the verbose mode or a JSONL event log.
+"""
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+# Output modes
+VERBOSE = "verbose"    # Every track, as before (slow for big libraries)
+PROGRESS = "progress"  # Counters redrawn every refresh interval
+QUIET = "quiet"        # No console output at all
+MODES = (VERBOSE, PROGRESS, QUIET)
+
+COUNTERS = ("resolved", "found", "cached", "missing", "skipped", "added", "rejected")
+
+
+class Progress:
+    """
+    Thread-safe progress tracker shared by the search workers and the
+    playlist writer.
+
+    On a terminal the summary line is redrawn in place every
+    `refresh_seconds`. When stdout is not a terminal (CI, log collectors)
+    a full line is printed every `log_seconds` instead.
+    """
+
+    def __init__(self, mode: str = PROGRESS, refresh_seconds: float = 0.5,
+                 log_seconds: float = 15.0, event_log: Optional[str] = None):
+        self._lock = threading.RLock()
+        self._events = None
+        self.reset(mode, refresh_seconds, log_seconds, event_log)
+
+    def reset(self, mode: str = PROGRESS, refresh_seconds: float = 0.5,
+              log_seconds: float = 15.0, event_log: Optional[str] = None):
+        """Clears the counters and applies new settings."""
+        if mode not in MODES:
+            raise ValueError(f"Unknown progress mode '{mode}' (expected one of {', '.join(MODES)})")
+        with self._lock:
+            self.close()
+            self.mode = mode
+            self.refresh_seconds = refresh_seconds
+            self.log_seconds = log_seconds
+            self.counts: Dict[str, int] = {name: 0 for name in COUNTERS}
+            self.stage = ""
+            self.stage_total: Optional[int] = None
+            self.stage_done = 0
+            self._start = time.monotonic()
+            self._last_draw = 0.0
+            self._line_width = 0  # Width of the status line currently on screen
+            if event_log:
+                self._events = open(event_log, "a", encoding="utf-8")
+
+    @property
+    def verbose(self) -> bool:
+        return self.mode == VERBOSE
+
+    @property
+    def _interactive(self) -> bool:
+        return sys.stdout.isatty()
+
+    # ----- RECORDING -----
+
+    def start_stage(self, name: str, total: Optional[int] = None):
+        """Starts a new stage (usually a playlist); the line shows its progress."""
+        with self._lock:
+            self.stage = name
+            self.stage_total = total
+            self.stage_done = 0
+        self.log_event("stage", name=name, total=total)
+
+    def record(self, counter: str, n: int = 1, line: Optional[str] = None, log: bool = True, **fields):
+        """
+        Counts `n` outcomes of one kind. `line` is printed in verbose mode
+        only; `fields` go to the event log unless `log` is False.
+        """
+        with self._lock:
+            self.counts[counter] += n
+            if counter == "resolved":
+                self.stage_done += n
+            if line is not None and self.verbose:
+                print(line)
+            if log and self._events is not None:
+                self.log_event(counter, n=n, **fields)
+            self._maybe_draw()
+
+    def message(self, text: str = ""):
+        """Prints a regular console line without garbling the status line."""
+        if self.mode == QUIET:
+            return
+        with self._lock:
+            redraw = bool(self._line_width)
+            self._clear_line()
+            print(text)
+            if redraw:
+                self._draw()  # Put the status line back under the message
+
+    def log_event(self, event: str, **fields):
+        if self._events is None:
+            return
+        record = {"ts": datetime.now().isoformat(), "event": event, "stage": self.stage}
+        record.update({k: v for k, v in fields.items() if v is not None})
+        with self._lock:
+            self._events.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    # ----- RENDERING -----
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self._start
+        rate = self.counts["resolved"] / elapsed if elapsed > 0 else 0.0
+        stage = ""
+        if self.stage:
+            done = f"{self.stage_done}/{self.stage_total}" if self.stage_total else str(self.stage_done)
+            stage = f"{self.stage} {done} · "
+        c = self.counts
+        return (f"⏳ {stage}resolved {c['resolved']} (found {c['found']}, cached {c['cached']}, "
+                f"missing {c['missing']}) · "
+                f"skipped {c['skipped']} · added {c['added']}"
+                + (f" (rejected {c['rejected']})" if c['rejected'] else "")
+                + f" · {rate:.1f} tracks/s")
+
+    def _maybe_draw(self):
+        if self.mode != PROGRESS:
+            return
+        now = time.monotonic()
+        interval = self.refresh_seconds if self._interactive else self.log_seconds
+        if now - self._last_draw < interval:
+            return
+        self._last_draw = now
+        self._draw()
+
+    def _draw(self):
+        line = "  " + self.summary()
+        if self._interactive:
+            padding = " " * max(0, self._line_width - len(line))
+            sys.stdout.write("\r" + line + padding)
+            sys.stdout.flush()
+            self._line_width = len(line)
+        else:
+            print(line, flush=True)
+
+    def _clear_line(self):
+        if self._line_width:
+            sys.stdout.write("\r" + " " * self._line_width + "\r")
+            self._line_width = 0
+
+    def finish(self):
+        """Prints the final counters and flushes the event log."""
+        with self._lock:
+            if self.mode == PROGRESS:
+                self._clear_line()
+                print("  " + self.summary())
+            if self._events is not None:
+                self._events.flush()
+
+    def close(self):
+        with self._lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
@@ -0,0 +1,127 @@
+"""
+Rate limiting primitives shared by all worker threads.
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing `rate` requests per second on average,
+    with up to `burst` requests going out back to back.
+
+    Callers reserve a token up front and then sleep off their share of the
+    debt, so waiting threads are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0           # acquire() calls that had to sleep
+        self.wait_seconds = 0.0  # total time spent sleeping in acquire()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Blocks until `tokens` are available. Returns the seconds spent waiting."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            if delay > 0:
+                self.waits += 1
+                self.wait_seconds += delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def set_rate(self, rate: float):
+        """Changes the refill rate, keeping tokens earned at the old rate."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket whose rate is tuned with AIMD (additive increase,
+    multiplicative decrease), the same scheme TCP uses for congestion control.
+
+    Every successful call nudges the rate up so that it climbs by about
+    `increase` requests/sec for each second of clean traffic. A throttling
+    signal cuts the rate by `decrease` and empties the bucket, which doubles
+    as the retry backoff. Throttles arriving within one interval of the last
+    cut are treated as the same event, so a burst of concurrent failures
+    only halves the rate once.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.2,
+                 max_rate: float = 10.0, increase: float = 0.05, decrease: float = 0.5):
+        super().__init__(min(max(rate, min_rate), max_rate), burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.throttle_count = 0
+        self._last_cut = float("-inf")
+
+    def set_rate(self, rate: float):
+        super().set_rate(min(max(rate, self.min_rate), self.max_rate))
+
+    def record_success(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def record_throttle(self) -> float:
+        """
+        Registers a rate-limit signal. Returns the new rate.
+        The next `acquire()` waits at least one interval at that rate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.throttle_count += 1
+            if now - self._last_cut >= 1.0 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_cut = now
+            self._tokens = min(self._tokens, 0.0) - 1.0
+            return self.rate
+
+
+class AdaptiveBatchSize:
+    """
+    Request batch size tuned with the same AIMD scheme as
+    AdaptiveRateLimiter: every full batch the service accepts grows the
+    size by `increase`, a rejected batch halves it.
+    """
+
+    def __init__(self, size: int, min_size: int = 1, max_size: int = 50,
+                 increase: int = 5, decrease: float = 0.5):
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.size = min(max(size, self.min_size), self.max_size)
+        self.increase = increase
+        self.decrease = decrease
+        self.failure_count = 0
+        self._lock = threading.Lock()
+
+    def record_success(self, n: int):
+        """Registers an accepted batch of `n` items."""
+        with self._lock:
+            if n >= self.size:
+                self.size = min(self.max_size, self.size + self.increase)
+
+    def record_failure(self) -> int:
+        """Registers a rejected batch. Returns the new size."""
+        with self._lock:
+            self.failure_count += 1
+            self.size = max(self.min_size, int(self.size * self.decrease))
+            return self.size
@@ -0,0 +1,130 @@
+"""
+Run scheduling: the order playlists are migrated in, and when a run stops.
+
+Each playlist (and Liked Songs) becomes a `WorkItem` carrying an estimate
+of the YouTube Music calls it needs. Items are ordered by configurable
+priority rules, with anything a previous run left queued going first,
+and the run stops once its call or time budget is spent. Items that were
+not reached are reported as queued; they were never marked completed, so
+the next run picks them up.
+"""
+import time
+from typing import Callable, Iterable, List, Optional, Sequence
+
+# Priority rules, most significant first in RUN_PRIORITY
+PRIORITY_RULES = ("liked_first", "smallest_first", "recently_modified")
+
+
+class BudgetExhausted(Exception):
+    """Raised when the run's call or time budget is spent mid-playlist."""
+
+
+class WorkItem:
+    """
+    One playlist (or Liked Songs) and its estimated YouTube Music calls:
+    searches for uncached tracks, creates/adds for tracks not in the YT
+    playlist yet, and reads of playlists the local mirror does not know.
+    """
+
+    def __init__(self, key: str, name: str, tracks: int, liked: bool = False,
+                 modified: Optional[str] = None, carried_over: bool = False, payload=None):
+        self.key = key
+        self.name = name
+        self.tracks = tracks
+        self.liked = liked
+        self.modified = modified          # Newest added_at among the tracks, if known
+        self.carried_over = carried_over  # Queued by the previous run
+        self.payload = payload            # The planned tracks, if fetched up front
+        self.searches = 0
+        self.writes = 0
+        self.reads = 0
+
+    @property
+    def calls(self) -> int:
+        return self.searches + self.writes + self.reads
+
+    def __repr__(self) -> str:
+        return f"WorkItem({self.key!r}, {self.name!r}, calls={self.calls})"
+
+
+def order_work(items: Iterable[WorkItem], rules: Sequence[str]) -> List[WorkItem]:
+    """
+    Sorts work items by `rules`, most significant first. Items carried
+    over from a previous run always go first; ties keep their order.
+    """
+    unknown = [rule for rule in rules if rule not in PRIORITY_RULES]
+    if unknown:
+        raise ValueError(f"Unknown priority rule(s) {', '.join(unknown)} "
+                         f"(expected {', '.join(PRIORITY_RULES)})")
+    ordered = list(items)
+    # Stable sorts, least significant rule first
+    for rule in reversed(rules):
+        if rule == "liked_first":
+            ordered.sort(key=lambda item: not item.liked)
+        elif rule == "smallest_first":
+            ordered.sort(key=lambda item: (item.calls, item.tracks))
+        elif rule == "recently_modified":
+            ordered.sort(key=lambda item: item.modified or "", reverse=True)
+    ordered.sort(key=lambda item: not item.carried_over)
+    return ordered
+
+
+class RunBudget:
+    """
+    Per-run limit on API calls and wall-clock time. `spent` returns the
+    calls made so far; None for either limit means unlimited.
+    """
+
+    def __init__(self, calls: Optional[int] = None, seconds: Optional[float] = None,
+                 spent: Callable[[], int] = lambda: 0):
+        self.reset(calls, seconds, spent)
+
+    def reset(self, calls: Optional[int] = None, seconds: Optional[float] = None,
+              spent: Callable[[], int] = lambda: 0):
+        self.calls = calls
+        self.seconds = seconds
+        self._spent = spent
+        self._start = time.monotonic()
+
+    @property
+    def spent(self) -> int:
+        return self._spent()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    @property
+    def remaining_calls(self) -> Optional[int]:
+        return None if self.calls is None else max(0, self.calls - self.spent)
+
+    def exhausted(self) -> Optional[str]:
+        """Which budget is spent ("call budget" or "time budget"), or None."""
+        if self.calls is not None and self.spent >= self.calls:
+            return "call budget"
+        if self.seconds is not None and self.elapsed >= self.seconds:
+            return "time budget"
+        return None
+
+    def check(self):
+        """Raises BudgetExhausted once either budget is spent."""
+        reason = self.exhausted()
+        if reason:
+            raise BudgetExhausted(reason)
+
+    def select(self, ordered: Sequence[WorkItem]) -> List[WorkItem]:
+        """
+        The longest prefix of `ordered` whose estimated calls fit in the
+        remaining call budget. The first item is always included, so a
+        playlist larger than the whole budget still makes progress.
+        """
+        remaining = self.remaining_calls
+        if remaining is None:
+            return list(ordered)
+        selected: List[WorkItem] = []
+        for item in ordered:
+            if selected and item.calls > remaining:
+                break
+            selected.append(item)
+            remaining -= item.calls
+        return selected
@@ -0,0 +1,120 @@
+"""
+Match store shared by every migration process on a machine.
+
+When many accounts are migrated, most of their songs overlap, so a match
+found for one user is recorded here under its Spotify track id and
+reused by everyone else instead of searching YouTube Music again.
+
+It is a single SQLite file opened by each process. WAL mode lets readers
+proceed while another process writes; writers wait up to `busy_timeout`
+for each other. Every write is its own short transaction so locks are
+held for microseconds. The store is best-effort: if it is locked for too
+long or unreadable, lookups miss and writes are dropped rather than
+failing the migration.
+"""
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional
+
+# Each entry upgrades the schema by one version (PRAGMA user_version).
+SCHEMA_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS matches (
+        spotify_id TEXT PRIMARY KEY,
+        video_id   TEXT NOT NULL,
+        isrc       TEXT,
+        matched_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_matches_isrc ON matches (isrc)
+    """,
+]
+
+BUSY_TIMEOUT_MS = 30000
+
+
+class SharedMatchStore:
+    """
+    Spotify track id → YouTube Music videoId, shared between processes.
+
+    Only successful matches are shared: a miss may be caused by a
+    transient error in one process and should not stop others from
+    searching.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+        self.path = path
+        self.errors = 0
+        self._lock = threading.Lock()
+        # Autocommit: each statement is its own transaction
+        self._conn = sqlite3.connect(path, timeout=busy_timeout_ms / 1000,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._apply_migrations()
+
+    def _apply_migrations(self):
+        # BEGIN IMMEDIATE serializes processes opening a new store at the same time
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+                for target, script in enumerate(SCHEMA_MIGRATIONS[version:], version + 1):
+                    for statement in script.split(";"):
+                        if statement.strip():
+                            self._conn.execute(statement)
+                    self._conn.execute(f"PRAGMA user_version = {target}")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, spotify_id: Optional[str], isrc: Optional[str] = None) -> Optional[str]:
+        """Returns the shared videoId for a track (by Spotify id, then ISRC), or None."""
+        try:
+            with self._lock:
+                if spotify_id:
+                    row = self._conn.execute(
+                        "SELECT video_id FROM matches WHERE spotify_id = ?", (spotify_id,)
+                    ).fetchone()
+                    if row:
+                        return row["video_id"]
+                if isrc:
+                    row = self._conn.execute(
+                        "SELECT video_id FROM matches WHERE isrc = ? LIMIT 1", (isrc,)
+                    ).fetchone()
+                    if row:
+                        return row["video_id"]
+        except sqlite3.Error:
+            self.errors += 1
+        return None
+
+    def put(self, spotify_id: Optional[str], video_id: Optional[str], isrc: Optional[str] = None):
+        """Shares a successful match. Misses and tracks without an id are ignored."""
+        if not spotify_id or not video_id:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO matches (spotify_id, video_id, isrc, matched_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(spotify_id) DO UPDATE SET "
+                    "video_id = excluded.video_id, isrc = COALESCE(excluded.isrc, isrc), "
+                    "matched_at = excluded.matched_at",
+                    (spotify_id, video_id, isrc, datetime.now().isoformat()),
+                )
+        except sqlite3.Error:
+            self.errors += 1
+
+    def count(self) -> int:
+        try:
+            with self._lock:
+                return self._conn.execute("SELECT COUNT(*) FROM matches").fetchone()[0]
+        except sqlite3.Error:
+            self.errors += 1
+            return 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
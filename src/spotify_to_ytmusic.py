@@ -1,16 +1,38 @@
 #!/usr/bin/env python3
+import argparse
 import os
-import time
 import json
 import json.decoder
-from datetime import datetime
-from typing import Dict, Tuple, Optional, List, Set
+import queue
+import re
+import signal
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Tuple, Optional, List, Set, Iterable, Iterator, Callable
 
 from dotenv import load_dotenv
+import requests
 import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from ytmusicapi import YTMusic
 
+from match_cache import MatchCache
+from metrics import Metrics, write_json_report, write_prometheus_textfile
+from normalize import canonical_key, search_query
+from progress import Progress
+from rate_limit import AdaptiveBatchSize, AdaptiveRateLimiter
+from scheduler import BudgetExhausted, RunBudget, WorkItem, order_work
+from shared_store import SharedMatchStore
+from state_store import MigrationStateStore
+from track import Track
+from transport import build_session
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -23,12 +45,69 @@ SPOTIFY_SCOPE = (
     "playlist-read-collaborative"
 )
 
+# Spotify pages fetched concurrently once the first page reports the total
+SPOTIFY_PAGE_WORKERS = 4
+
+# Only the track attributes the migrator reads are requested from Spotify
+PLAYLIST_ITEM_FIELDS = (
+    "items(added_at,track(id,name,artists(name),album(name),external_ids(isrc))),"
+    "total,limit,offset"
+)
+
 # Path to your ytmusicapi headers file (created by setup_ytmusic_browser.py)
 YTMUSIC_AUTH_FILE = "headers.json"
 
 # Optional: rate limiting (increased to avoid API throttling)
-SEARCH_SLEEP_SECONDS = 0.5  # Increased from 0.1 to avoid rate limiting
-ADD_SLEEP_SECONDS = 0.3     # Slight increase for safety
+# These are starting rates for the first run. Rates adapt while running
+# (AIMD: additive increase on success, multiplicative decrease on throttling)
+# and the learned rates are saved in the migration state for the next run.
+SEARCH_RATE_PER_SECOND = 2.0  # Global search rate shared by all workers
+SEARCH_BURST = 4              # Searches allowed back to back before pacing kicks in
+WRITE_RATE_PER_SECOND = 3.0   # Playlist create/add calls
+READ_RATE_PER_SECOND = 2.0    # Library and playlist reads
+MIN_RATE_PER_SECOND = 0.2     # Floor after repeated throttling
+MAX_RATE_PER_SECOND = 10.0    # Ceiling for the additive increase
+RATE_INCREASE_PER_SECOND = 0.05  # How fast rates climb while calls succeed
+RATE_DECREASE_FACTOR = 0.5       # Rate multiplier on a throttling signal
+
+# Number of parallel search workers (1 = search one track at a time)
+SEARCH_WORKERS = 4
+
+# HTTP transport shared by the Spotify and YouTube Music clients: a
+# keep-alive connection pool per host, so workers reuse connections
+# instead of opening a new TLS connection for each request
+HTTP_POOL_SIZE = None       # Connections per host; None = enough for all workers
+HTTP_CONNECT_TIMEOUT = 5.0  # Seconds to establish a connection
+HTTP_READ_TIMEOUT = 30.0    # Seconds to wait for a response
+HTTP_COMPRESSION = True     # Accept gzip/deflate (and br/zstd if available) responses
+
+# Planning pre-pass: collect every playlist and liked track first, search
+# each unique track once, then build the playlists from the results.
+# Uses more memory than pure streaming but never searches a track twice.
+GLOBAL_DEDUP = True
+
+LIKED_SONGS_PLAYLIST_NAME = "Spotify Liked Songs"
+
+# Incremental sync: skip playlists whose Spotify snapshot_id has not changed
+# since they were last migrated (and whose YT Music playlist still exists)
+INCREMENTAL_SYNC = True
+
+# Run scheduling: playlists and Liked Songs are migrated in priority order,
+# most significant rule first. "liked_first", "smallest_first" (fewest
+# estimated YT Music calls), "recently_modified" (newest added track; needs
+# GLOBAL_DEDUP). Anything a budget left queued goes first on the next run.
+RUN_PRIORITY = ["liked_first"]
+# Per-run budgets (None = unlimited): the run stops cleanly once one is spent
+RUN_CALL_BUDGET = None          # YouTube Music API calls
+RUN_TIME_BUDGET_MINUTES = None
+
+# Streaming pipeline: resolved songs are added in batches as soon as a batch
+# fills up, while searching continues.
+ADD_BATCH_SIZE = 50           # ytmusicapi accepts up to 50 items per add
+# Add requests shrink after a rejected batch and grow back while the
+# service accepts them; failing batches are split to isolate bad videoIds
+ADD_BATCH_MIN_SIZE = 5
+RESOLVE_WINDOW_PER_WORKER = 4  # Tracks queued ahead per search worker
 
 # Duplicate handling mode
 # 'merge' = Add only new songs to existing playlists (recommended)
@@ -36,66 +115,329 @@ ADD_SLEEP_SECONDS = 0.3     # Slight increase for safety
 DUPLICATE_MODE = "merge"
 
 # State persistence files
+STATE_FILE = ".migration_state.db"
+LEGACY_STATE_FILE = ".migration_state.json"  # Imported once into STATE_FILE
+FAILED_SONGS_FILE = "failed_songs.txt"    # Readable summary, written at the end of a run
+
+# Checkpoints inside a playlist: resolved songs and added tracks are
+# committed every N tracks or T seconds, whichever comes first, so an
+# interrupted run only redoes the work since the last checkpoint
+CHECKPOINT_EVERY_TRACKS = 200
+CHECKPOINT_EVERY_SECONDS = 30.0
+FAILED_SONGS_LOG = "failed_songs.jsonl"   # One JSON line per failed search, as it happens; None to disable
+
+# How long a cached "not found" is trusted before the song is searched again.
+# Songs with no results may be uploaded later; API errors were never really searched.
+NO_RESULTS_TTL_DAYS = 30
+API_ERROR_TTL_HOURS = 6
+
+# Match store shared by every migration on this machine (e.g. all accounts of
+# a batch), so a song found for one user is never searched again for another.
+# None to disable.
+SHARED_MATCH_DB = None  # e.g. "/var/lib/spotify-to-ytmusic/shared_matches.db"
+
+# Console output: "progress" (counters redrawn in place), "verbose" (every
+# track, slow for big libraries) or "quiet" (nothing)
+PROGRESS_MODE = "progress"
+PROGRESS_REFRESH_SECONDS = 0.5  # Redraw interval on a terminal
+PROGRESS_LOG_SECONDS = 15.0     # Interval between progress lines when stdout is not a terminal
+# Optional JSONL log with one event per track (found, cached, missing, skipped, added)
+EVENT_LOG_FILE = None
+
+# Batch mode (--batch MANIFEST): accounts migrated at the same time, each in
+# its own process with its own rate limiters
+BATCH_MAX_PARALLEL = 4
+
+# Run report: per-endpoint calls, latency, retries, throttles and sleeps
+RUN_REPORT_FILE = "migration_report.json"
+# Optional Prometheus textfile (e.g. for node_exporter's textfile collector); None to disable
+PROMETHEUS_TEXTFILE = None
+
+
+# ----- CONSOLE OUTPUT -----
+
+# All console output goes through `progress` so the status line stays intact
+progress = Progress(PROGRESS_MODE, PROGRESS_REFRESH_SECONDS, PROGRESS_LOG_SECONDS)
+
 
 # ----- STATE MANAGEMENT -----
 
-def load_migration_state() -> dict:
-    """Load previous migration state if it exists."""
-    if os.path.exists(STATE_FILE):
-        try:
-            with open(STATE_FILE, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Warning: Could not load state file: {e}")
-            print("Starting fresh migration...")
-    
-    return {
-        "version": "2.0.0",
-        "last_updated": None,
-        "song_cache": {},
-        "completed_playlists": [],
-        "failed_songs": []
-    }
-
-
-def save_migration_state(state: dict):
-    """Save current migration state to file."""
-    state["last_updated"] = datetime.now().isoformat()
+def load_migration_state() -> MigrationStateStore:
+    """
+    Open the migration state database, importing a legacy JSON state file
+    on first use. A database that cannot be read is moved aside and the
+    migration starts fresh.
+    """
     try:
-        with open(STATE_FILE, 'w') as f:
-            json.dump(state, f, indent=2)
-    except IOError as e:
-        print(f"Warning: Could not save state file: {e}")
+        state = MigrationStateStore(STATE_FILE)
+    except sqlite3.DatabaseError as e:
+        backup = f"{STATE_FILE}.corrupt-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        progress.message(f"Warning: Could not load state file: {e}")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(STATE_FILE + suffix):
+                os.replace(STATE_FILE + suffix, backup + suffix)
+        progress.message(f"Moved it to {backup}. Starting fresh migration...")
+        state = MigrationStateStore(STATE_FILE)
+    try:
+        if state.import_json_state(LEGACY_STATE_FILE):
+            progress.message(f"  Imported previous state from {LEGACY_STATE_FILE} (safe to delete now)")
+    except (json.JSONDecodeError, IOError) as e:
+        progress.message(f"Warning: Could not import legacy state file: {e}")
+    return state
+
+
+def save_migration_state(state: MigrationStateStore):
+    """Commit pending state changes to disk."""
+    try:
+        save_learned_rates(state)
+        state.commit()
+    except sqlite3.Error as e:
+        progress.message(f"Warning: Could not save state: {e}")
+
+
+class Checkpointer:
+    """
+    Commits the state every `every_tracks` resolved tracks or
+    `every_seconds`, whichever comes first. Each commit is an atomic
+    SQLite transaction, so a crash leaves the last checkpoint intact.
+    """
+
+    def __init__(self, every_tracks: int = CHECKPOINT_EVERY_TRACKS,
+                 every_seconds: float = CHECKPOINT_EVERY_SECONDS):
+        self.reset(every_tracks, every_seconds)
+
+    def reset(self, every_tracks: int = CHECKPOINT_EVERY_TRACKS,
+              every_seconds: float = CHECKPOINT_EVERY_SECONDS):
+        self.every_tracks = every_tracks
+        self.every_seconds = every_seconds
+        self.count = 0
+        self._pending = 0
+        self._last = time.monotonic()
+
+    def tick(self, state: MigrationStateStore, n: int = 1):
+        """Counts resolved tracks and saves once an interval has passed."""
+        self._pending += n
+        if (self._pending >= self.every_tracks
+                or time.monotonic() - self._last >= self.every_seconds):
+            self.save(state)
+
+    def save(self, state: MigrationStateStore):
+        save_migration_state(state)
+        self.count += 1
+        self._pending = 0
+        self._last = time.monotonic()
+
+
+checkpoints = Checkpointer()
+run_budget = RunBudget()
+
+
+@contextmanager
+def graceful_interrupts():
+    """
+    Turns SIGINT and SIGTERM into KeyboardInterrupt in the main thread, so
+    the playlist writers flush their partial batches while the stack
+    unwinds and the caller can save. A second signal exits immediately.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    stopping = False
+
+    def handler(signum, frame):
+        nonlocal stopping
+        if stopping:
+            os._exit(128 + signum)
+        stopping = True
+        raise KeyboardInterrupt(signal.Signals(signum).name)
 
+    previous = {sig: signal.signal(sig, handler) for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        yield
+    finally:
+        for sig, old_handler in previous.items():
+            signal.signal(sig, old_handler)
 
-def save_failed_songs_readable(state: dict):
-    """Save failed songs to a human-readable text file."""
-    if not state["failed_songs"]:
+
+def save_failed_songs_readable(state: MigrationStateStore):
+    """
+    Save failed songs to a human-readable text file, one entry per song
+    with every playlist it is missing from. Rendered once per run from the
+    failure ledger; FAILED_SONGS_LOG has the failures as they happen.
+    """
+    if not state.count_failed():
         # No failed songs, remove file if it exists
         if os.path.exists(FAILED_SONGS_FILE):
             os.remove(FAILED_SONGS_FILE)
         return
     
+    # Write to a temporary file and rename, so an interrupted run never
+    # leaves a truncated report behind
+    tmp_path = FAILED_SONGS_FILE + ".tmp"
     try:
-        with open(FAILED_SONGS_FILE, 'w') as f:
+        total = 0
+        with open(tmp_path, 'w') as f:
             f.write("Failed Songs - Could Not Find on YouTube Music\n")
             f.write("=" * 70 + "\n\n")
             
-            for song in state["failed_songs"]:
+            for song in state.iter_failures():
                 f.write(f"Title: {song['title']}\n")
                 f.write(f"Artist: {song['artist']}\n")
-                f.write(f"Album: {song.get('album', 'N/A')}\n")
-                f.write(f"Playlist: {song['playlist']}\n")
-                f.write(f"Failed at: {song['failed_at']}\n")
+                f.write(f"Album: {song.get('album') or 'N/A'}\n")
+                f.write(f"Playlists: {', '.join(song['playlists']) or 'N/A'}\n")
+                f.write(f"Reason: {song['reason'] or 'unknown'}\n")
+                f.write(f"Failed searches: {song['attempts']}\n")
+                f.write(f"Failed at: {song['first_failed_at']}"
+                        + (f" (last {song['last_failed_at']})" if song['attempts'] > 1 else "") + "\n")
                 f.write("-" * 70 + "\n\n")
+                total += 1
             
-            f.write(f"\nTotal failed songs: {len(state['failed_songs'])}\n")
+            f.write(f"\nTotal failed songs: {total}\n")
+        os.replace(tmp_path, FAILED_SONGS_FILE)
     except IOError as e:
-        print(f"Warning: Could not save failed songs file: {e}")
+        progress.message(f"Warning: Could not save failed songs file: {e}")
 
-# State persistence files
-STATE_FILE = ".migration_state.json"
-FAILED_SONGS_FILE = "failed_songs.txt"
+
+class FailureLog:
+    """
+    Append-only JSONL report of failed searches. Each failure is written
+    once when it happens, so the cost does not grow with the ledger.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+
+    def open(self, path: Optional[str]):
+        self.close()
+        if path:
+            self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, **record):
+        if self._file is None:
+            return
+        line = json.dumps({"ts": datetime.now().isoformat(), **record}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+failure_log = FailureLog()
+
+
+# ----- RATE LIMITING -----
+
+def _make_limiter(rate: float, burst: int = 1) -> AdaptiveRateLimiter:
+    return AdaptiveRateLimiter(
+        rate,
+        burst,
+        min_rate=MIN_RATE_PER_SECOND,
+        max_rate=MAX_RATE_PER_SECOND,
+        increase=RATE_INCREASE_PER_SECOND,
+        decrease=RATE_DECREASE_FACTOR,
+    )
+
+
+# One bucket per kind of call, shared by every worker, so the rate is a
+# global ceiling no matter how many workers run.
+search_limiter = _make_limiter(SEARCH_RATE_PER_SECOND, SEARCH_BURST)
+write_limiter = _make_limiter(WRITE_RATE_PER_SECOND)
+read_limiter = _make_limiter(READ_RATE_PER_SECOND)
+add_batch_size = AdaptiveBatchSize(ADD_BATCH_SIZE, ADD_BATCH_MIN_SIZE, ADD_BATCH_SIZE)
+
+
+def reset_rate_limiters():
+    """Recreates the limiters from the current config (e.g. after per-account overrides)."""
+    global search_limiter, write_limiter, read_limiter, add_batch_size
+    search_limiter = _make_limiter(SEARCH_RATE_PER_SECOND, SEARCH_BURST)
+    write_limiter = _make_limiter(WRITE_RATE_PER_SECOND)
+    read_limiter = _make_limiter(READ_RATE_PER_SECOND)
+    add_batch_size = AdaptiveBatchSize(ADD_BATCH_SIZE, ADD_BATCH_MIN_SIZE, ADD_BATCH_SIZE)
+
+
+def _limiters() -> Dict[str, AdaptiveRateLimiter]:
+    return {"search": search_limiter, "write": write_limiter, "read": read_limiter}
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """
+    True for errors that mean we are being throttled: the empty-body
+    JSONDecodeError YouTube Music returns when rate limiting, or an HTTP 429.
+    """
+    if isinstance(e, json.decoder.JSONDecodeError):
+        return True
+    error_str = str(e)
+    return "429" in error_str or "too many requests" in error_str.lower()
+
+
+def load_learned_rates(state: MigrationStateStore):
+    """Start each limiter at the rate learned by the previous run."""
+    raw = state.get_meta("learned_rates")
+    if not raw:
+        return
+    try:
+        rates = json.loads(raw)
+    except json.JSONDecodeError:
+        return
+    for name, limiter in _limiters().items():
+        if name in rates:
+            limiter.set_rate(rates[name])
+
+
+def save_learned_rates(state: MigrationStateStore):
+    state.set_meta("learned_rates", json.dumps({name: limiter.rate for name, limiter in _limiters().items()}))
+
+
+# ----- METRICS -----
+
+# Every external call goes through a client wrapped by metrics.instrument()
+metrics = Metrics(is_throttle=is_rate_limit_error)
+
+
+def write_run_report(state: MigrationStateStore, cache: MatchCache):
+    """Writes the JSON run report and, if configured, the Prometheus textfile."""
+    report = metrics.snapshot(_limiters(), extra={
+        "cache": {
+            "lookups": cache.lookups,
+            "hit_rate": round(cache.hit_rate, 4),
+            "hits": dict(cache.hits),
+            "misses": cache.misses,
+            "coalesced": cache.inflight.coalesced,
+        },
+        "state": {
+            "cached_songs": state.count_songs(),
+            "failed_songs": state.count_failed(),
+            "checkpoints": checkpoints.count,
+            "queued_playlists": len(json.loads(state.get_meta("queued_work") or "[]")),
+        },
+    })
+    try:
+        if RUN_REPORT_FILE:
+            write_json_report(RUN_REPORT_FILE, report)
+        if PROMETHEUS_TEXTFILE:
+            write_prometheus_textfile(PROMETHEUS_TEXTFILE, report)
+    except OSError as e:
+        progress.message(f"Warning: Could not write run report: {e}")
+
+
+# ----- HTTP TRANSPORT -----
+
+_http_session: Optional[requests.Session] = None
+
+
+def get_http_session() -> requests.Session:
+    """The pooled session shared by both clients, built on first use."""
+    global _http_session
+    if _http_session is None:
+        # Search workers or page fetchers, plus the playlist writer and the main thread
+        pool_size = HTTP_POOL_SIZE or max(SEARCH_WORKERS, SPOTIFY_PAGE_WORKERS) + 2
+        _http_session = build_session(pool_size, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_COMPRESSION)
+    return _http_session
 
 
 # ----- SPOTIFY HELPERS -----
@@ -108,50 +450,159 @@ def get_spotify_client() -> spotipy.Spotify:
       SPOTIPY_REDIRECT_URI
     and handles browser auth automatically.
     """
-    auth_manager = SpotifyOAuth(scope=SPOTIFY_SCOPE)
-    return spotipy.Spotify(auth_manager=auth_manager)
+    session = get_http_session()
+    timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    auth_manager = SpotifyOAuth(scope=SPOTIFY_SCOPE, requests_session=session, requests_timeout=timeout)
+    return spotipy.Spotify(auth_manager=auth_manager, requests_session=session, requests_timeout=timeout)
+
+
+def iter_spotify_pages(fetch_page: Callable[[int], dict], first_page: dict,
+                       workers: Optional[int] = None) -> Iterator[dict]:
+    """
+    Yields `first_page` and then every remaining page of a Spotify paging
+    object, in order. The remaining offsets are computed from the first
+    page's `total` and fetched concurrently (at most `workers` at a time,
+    a couple of pages ahead of the consumer) instead of following `next`
+    one request at a time. `workers` defaults to SPOTIFY_PAGE_WORKERS.
+    """
+    if workers is None:
+        workers = SPOTIFY_PAGE_WORKERS
+    yield first_page
+    limit = first_page.get("limit") or len(first_page.get("items", []))
+    total = first_page.get("total") or 0
+    if not limit:
+        return
+    offsets = range(first_page.get("offset", 0) + limit, total, limit)
+
+    if workers <= 1:
+        for offset in offsets:
+            yield fetch_page(offset)
+        return
+
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for offset in offsets:
+                pending.append(pool.submit(fetch_page, offset))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
 
 
 def get_all_spotify_playlists(sp: spotipy.Spotify) -> List[dict]:
+    def fetch(offset: int) -> dict:
+        return sp.current_user_playlists(limit=50, offset=offset)
+
     playlists = []
-    results = sp.current_user_playlists(limit=50)
-    while results:
-        playlists.extend(results["items"])
-        if results["next"]:
-            results = sp.next(results)
-        else:
-            break
+    for page in iter_spotify_pages(fetch, fetch(0)):
+        playlists.extend(page["items"])
     return playlists
 
 
-def get_playlist_tracks(sp: spotipy.Spotify, playlist_id: str) -> List[dict]:
-    tracks = []
-    results = sp.playlist_items(playlist_id, additional_types=["track"], limit=100)
-    while results:
-        for item in results["items"]:
+def _iter_page_tracks(pages: Iterable[dict]) -> Iterator[Track]:
+    """Yields the tracks of each page as the pages arrive."""
+    for page in pages:
+        for item in page["items"]:
             track = item.get("track")
             if track and track.get("id"):
-                tracks.append(track)
-        if results["next"]:
-            results = sp.next(results)
-        else:
-            break
-    return tracks
+                yield Track.from_spotify(track, item.get("added_at"))
+
+
+def stream_playlist_tracks(sp: spotipy.Spotify, playlist_id: str) -> Tuple[int, Iterator[Track]]:
+    """
+    Returns (total, tracks). The first page is fetched right away for the
+    total; later pages are fetched in parallel as the caller consumes tracks.
+    """
+    def fetch(offset: int) -> dict:
+        return sp.playlist_items(
+            playlist_id,
+            fields=PLAYLIST_ITEM_FIELDS,
+            additional_types=["track"],
+            limit=100,
+            offset=offset,
+        )
 
+    first = fetch(0)
+    return first.get("total", 0), _iter_page_tracks(iter_spotify_pages(fetch, first))
 
-def get_liked_tracks(sp: spotipy.Spotify) -> List[dict]:
-    tracks = []
-    results = sp.current_user_saved_tracks(limit=50)
-    while results:
-        for item in results["items"]:
+
+def _iter_liked_tracks(pages: Iterable[dict], since: Optional[dict]) -> Iterator[Track]:
+    """
+    Yields liked tracks newest-first with their `added_at`, and stops
+    paginating once it reaches the high-water mark `since`.
+    """
+    for page in pages:
+        for item in page["items"]:
             track = item.get("track")
+            added_at = item.get("added_at")
+            if since and added_at:
+                if added_at < since["added_at"]:
+                    return
+                if added_at == since["added_at"] and track and track.get("id") in since["track_ids"]:
+                    return
             if track and track.get("id"):
-                tracks.append(track)
-        if results["next"]:
-            results = sp.next(results)
-        else:
-            break
-    return tracks
+                yield Track.from_spotify(track, added_at)
+
+
+def stream_liked_tracks(sp: spotipy.Spotify, since: Optional[dict] = None) -> Tuple[int, Iterator[Track]]:
+    """
+    Same as stream_playlist_tracks(), for the user's Liked Songs.
+    With a high-water mark (see liked_high_water_mark()), only songs liked
+    after it are returned and older pages are never requested.
+    """
+    def fetch(offset: int) -> dict:
+        return sp.current_user_saved_tracks(limit=50, offset=offset)
+
+    # An incremental sync usually stops within a page or two, so pages are
+    # fetched one at a time rather than speculatively in parallel.
+    workers = 1 if since else SPOTIFY_PAGE_WORKERS
+    first = fetch(0)
+    pages = iter_spotify_pages(fetch, first, workers)
+    return first.get("total", 0), _iter_liked_tracks(pages, since)
+
+
+def get_playlist_tracks(sp: spotipy.Spotify, playlist_id: str) -> List[Track]:
+    return list(stream_playlist_tracks(sp, playlist_id)[1])
+
+
+def get_liked_tracks(sp: spotipy.Spotify, since: Optional[dict] = None) -> List[Track]:
+    return list(stream_liked_tracks(sp, since)[1])
+
+
+def liked_high_water_mark(state: MigrationStateStore, existing_playlists: Dict[str, str]) -> Optional[dict]:
+    """
+    Returns the newest liked song seen by the last run ({added_at, track_ids,
+    yt_playlist_id}), or None when a full Liked Songs sync is needed.
+    """
+    if not INCREMENTAL_SYNC:
+        return None
+    raw = state.get_meta("liked_high_water")
+    if not raw:
+        return None
+    try:
+        mark = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    if mark.get("yt_playlist_id") not in existing_playlists.values():
+        return None  # Playlist was deleted on YT Music; start over
+    return mark
+
+
+def save_liked_high_water_mark(state: MigrationStateStore, newest: List[Track], yt_playlist_id: str):
+    """Stores the newest liked songs (all sharing the latest added_at) as the new mark."""
+    added_at = newest[0].added_at
+    if not added_at:
+        return
+    track_ids = [t.id for t in newest if t.added_at == added_at]
+    state.set_meta("liked_high_water", json.dumps({
+        "added_at": added_at,
+        "track_ids": track_ids,
+        "yt_playlist_id": yt_playlist_id,
+    }))
 
 
 # ----- YOUTUBE MUSIC HELPERS -----
@@ -182,269 +633,889 @@ def get_ytmusic_client() -> YTMusic:
         print("=" * 70 + "\n")
         raise FileNotFoundError(f"{YTMUSIC_AUTH_FILE} not found. Please run setup_ytmusic_browser.py first.")
     
-    return YTMusic(YTMUSIC_AUTH_FILE)
+    return YTMusic(YTMUSIC_AUTH_FILE, requests_session=get_http_session())
+
+
+_DISPLAY_COUNT = re.compile(r"\d{1,3}(?:[,.\s]\d{3})+|\d+")
+
+
+def _library_count(count) -> Optional[int]:
+    """
+    Track count from the library listing as an int. ytmusicapi passes on
+    the display string ("1,234"); abbreviated ("1.2K") or missing counts
+    give None, so the mirror is not trusted for that playlist.
+    """
+    if isinstance(count, int):
+        return count
+    if isinstance(count, str):
+        count = unicodedata.normalize("NFKC", count).strip()
+        if _DISPLAY_COUNT.fullmatch(count):
+            return int(re.sub(r"\D", "", count))
+    return None
 
 
-def get_all_ytmusic_playlists(yt: YTMusic) -> Dict[str, str]:
+def get_all_ytmusic_playlists(yt: YTMusic, state: Optional[MigrationStateStore] = None) -> Dict[str, str]:
     """
     Returns a dict of {playlist_name: playlist_id} for all user's playlists.
     Uses exact name matching (case-sensitive).
     Includes retry logic for rate limiting.
+    With `state`, the track counts from the listing are recorded so the
+    local library mirror can tell which playlists changed.
     """
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            time.sleep(0.5)  # Small delay before fetching
+            read_limiter.acquire()
             playlists = yt.get_library_playlists(limit=None)
+            read_limiter.record_success()
+            if state is not None:
+                state.update_yt_library((pl['playlistId'], pl['title'], _library_count(pl.get('count')))
+                                       for pl in playlists)
             return {pl['title']: pl['playlistId'] for pl in playlists}
-        except json.decoder.JSONDecodeError as e:
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                progress.message(f"Warning: Could not fetch existing playlists: {e}")
+                return {}
+            new_rate = read_limiter.record_throttle()
             if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                print(f"  ⚠ Rate limit hit while fetching playlists, retrying in {wait_time}s...")
-                time.sleep(wait_time)
+                metrics.record_retry("yt.get_library_playlists")
+                progress.message(f"  ⚠ Rate limit hit while fetching playlists, slowing to {new_rate:.2f} req/s and retrying...")
             else:
-                print(f"Warning: Could not fetch existing playlists after {max_retries} attempts")
+                progress.message(f"Warning: Could not fetch existing playlists after {max_retries} attempts")
                 return {}
-        except Exception as e:
-            print(f"Warning: Could not fetch existing playlists: {e}")
-            return {}
     return {}
 
 
-def get_ytmusic_playlist_tracks(yt: YTMusic, playlist_id: str) -> Set[str]:
+def get_ytmusic_playlist_tracks(yt: YTMusic, playlist_id: str,
+                                state: Optional[MigrationStateStore] = None) -> Set[str]:
     """
     Returns a set of videoIds for all tracks in a YouTube Music playlist.
     Includes retry logic for rate limiting.
+    With `state`, the local mirror is used when its track count still
+    matches the library listing, and refreshed after a download.
     """
+    if state is not None:
+        mirrored = state.get_mirrored_yt_playlist(playlist_id)
+        if mirrored is not None:
+            return mirrored
+
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            time.sleep(0.5)  # Small delay before fetching
+            read_limiter.acquire()
             playlist = yt.get_playlist(playlist_id, limit=None)
+            read_limiter.record_success()
             tracks = playlist.get('tracks', [])
-            return {track['videoId'] for track in tracks if track.get('videoId')}
-        except json.decoder.JSONDecodeError as e:
+            video_ids = {track['videoId'] for track in tracks if track.get('videoId')}
+            if state is not None:
+                track_count = playlist.get('trackCount') or len(tracks)
+                state.replace_mirrored_yt_playlist(playlist_id, video_ids, track_count, playlist.get('title'))
+            return video_ids
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                progress.message(f"  Warning: Could not fetch playlist tracks: {e}")
+                return set()
+            new_rate = read_limiter.record_throttle()
             if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                print(f"  ⚠ Rate limit hit while fetching playlist tracks, retrying in {wait_time}s...")
-                time.sleep(wait_time)
+                metrics.record_retry("yt.get_playlist")
+                progress.message(f"  ⚠ Rate limit hit while fetching playlist tracks, slowing to {new_rate:.2f} req/s and retrying...")
             else:
-                print(f"  Warning: Could not fetch playlist tracks after {max_retries} attempts")
+                progress.message(f"  Warning: Could not fetch playlist tracks after {max_retries} attempts")
                 return set()
-        except Exception as e:
-            print(f"  Warning: Could not fetch playlist tracks: {e}")
-            return set()
     return set()
 
-def spotify_track_key(track: dict) -> Tuple[str, str]:
-    title = track["name"].strip().lower()
-    artists = ", ".join(a["name"] for a in track.get("artists", [])).strip().lower()
-    return title, artists
+
+def spotify_track_cache_key(track: Track) -> str:
+    """
+    Persistent title/artist key, e.g. "song title||artist a, artist b".
+    Remasters, edits, live tags and feat. variants of one recording share it.
+    """
+    return canonical_key(track.name, track.artists)
 
 
-def spotify_track_search_query(track: dict) -> str:
-    name = track["name"]
-    artists = ", ".join(a["name"] for a in track.get("artists", []))
-    album = track.get("album", {}).get("name", "")
-    return f"{name} {artists} {album}".strip()
+def spotify_track_search_query(track: Track) -> str:
+    return search_query(track.name, track.artists, track.album)
 
 
 def find_ytmusic_song(
     yt: YTMusic,
-    track: dict,
-    cache: Dict[Tuple[str, str], Optional[str]],
-    state: dict,
+    track: Track,
+    cache: MatchCache,
+    state: MigrationStateStore,
     playlist_name: str = "",
     max_results: int = 5,
-    max_retries: int = 3
+    max_retries: int = 3,
+    use_cache: bool = True,
+    count_lookup: bool = True
 ) -> Optional[str]:
     """
     Returns YouTube Music videoId for a Spotify track, or None if not found.
-    Uses both in-memory cache and persistent state file.
-    Includes retry logic with exponential backoff to handle rate limiting.
+    Checks the match cache by Spotify id, then ISRC, then title/artist key
+    before searching, unless `use_cache` is False. With `count_lookup`
+    False the cache lookup is left out of the hit rate.
+    Safe to call from several threads; every search waits on the shared
+    search limiter, which also slows down when rate limiting is detected.
+    Workers missing the cache for the same key at the same time share one
+    search.
     """
-    key = spotify_track_key(track)
-    if key in cache:
-        return cache[key]
+    spotify_id = track.id
+    isrc = track.isrc
+    cache_key = spotify_track_cache_key(track)
 
-    # Check persistent state cache
-    cache_key = f"{key[0]}||{key[1]}"
-    if cache_key in state["song_cache"]:
-        cached = state["song_cache"][cache_key]
+    cached = cache.lookup(spotify_id, isrc, cache_key, count=count_lookup) if use_cache else None
+    if cached is not None:
+        from_store = cached["from_store"]
         if cached["found"]:
-            print(f"         ✓ Found (cached from previous run)")
-            cache[key] = cached["videoId"]
-            return cached["videoId"]
+            line = None
+            if cached["shared"]:
+                line = "         ✓ Found (shared match cache)"
+            elif from_store:
+                line = "         ✓ Found (cached from previous run)"
+            progress.record("cached", line=line,
+                            spotify_id=spotify_id, title=track.name, video_id=cached["videoId"])
         else:
             # Previously failed, don't search again
-            print(f"         ✗ Not found (cached from previous run)")
-            cache[key] = None
-            return None
+            progress.record("missing", line="         ✗ Not found (cached from previous run)" if from_store else None,
+                            spotify_id=spotify_id, title=track.name, cached=True)
+        return cached["videoId"]
+
+    def search() -> Tuple[Optional[str], bool]:
+        # A search for this key may have finished since the lookup above
+        recent = cache.peek(cache_key)
+        if recent is not None:
+            return recent["videoId"], True
+        return _search_ytmusic_song(yt, track, cache, state, cache_key, playlist_name,
+                                    max_results, max_retries), False
+
+    (video_id, searched_before), coalesced = cache.inflight.do(cache_key, search)
+    if searched_before or coalesced:
+        # Another worker searched for the same recording
+        cache.remember(spotify_id, isrc, cache_key, video_id)
+        if video_id:
+            progress.record("cached", line="         ✓ Found (concurrent search)",
+                            spotify_id=spotify_id, title=track.name, video_id=video_id, coalesced=True)
+        else:
+            progress.record("missing", line="         ✗ Not found (concurrent search)",
+                            spotify_id=spotify_id, title=track.name, coalesced=True)
+    return video_id
+
 
+def _search_ytmusic_song(
+    yt: YTMusic,
+    track: Track,
+    cache: MatchCache,
+    state: MigrationStateStore,
+    cache_key: str,
+    playlist_name: str = "",
+    max_results: int = 5,
+    max_retries: int = 3
+) -> Optional[str]:
+    """Searches YouTube Music for a track and records the result in the cache and failure ledger."""
+    spotify_id = track.id
+    isrc = track.isrc
     query = spotify_track_search_query(track)
     video_id = None
+    miss_reason = "no_results"
     
-    # Retry logic with exponential backoff
+    # Retry logic; the limiter backs off on rate limiting
     for attempt in range(max_retries):
         try:
+            search_limiter.acquire()
             results = yt.search(query, filter="songs", limit=max_results)
+            search_limiter.record_success()
             
             if results:
                 # naive but usually fine: pick first result
                 candidate = results[0]
                 video_id = candidate.get("videoId") or candidate.get("video_id")
-                print(f"         ✓ Found on YouTube Music")
+                progress.record("found", line="         ✓ Found on YouTube Music",
+                                spotify_id=spotify_id, title=track.name, video_id=video_id)
             else:
-                print(f"         ✗ Not found on YouTube Music")
+                progress.record("missing", line="         ✗ Not found on YouTube Music",
+                                spotify_id=spotify_id, title=track.name, reason="no_results")
             
             break
             
-        except json.decoder.JSONDecodeError as e:
-            # Rate limiting detected - retry with exponential backoff
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                # Other unexpected errors
+                progress.message(f"         ✗ Unexpected error searching for {track.name} – {track.artist_names}: {e}")
+                progress.record("missing", spotify_id=spotify_id, title=track.name,
+                                reason="api_error", error=str(e))
+                video_id = None
+                miss_reason = "api_error"
+                break
+
+            # Rate limiting detected - slow down and retry
+            new_rate = search_limiter.record_throttle()
             if attempt < max_retries - 1:
-                wait_time = 2 ** attempt  # 1s, 2s, 4s
-                print(f"         ⚠ Rate limit hit, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
+                metrics.record_retry("yt.search")
+                progress.message(f"         ⚠ Rate limit hit, slowing to {new_rate:.2f} searches/s and retrying... (attempt {attempt + 1}/{max_retries})")
             else:
                 # Final attempt failed
-                artists = ", ".join(a["name"] for a in track.get("artists", []))
-                print(f"         ✗ API error after {max_retries} attempts: {track['name']} – {artists}")
+                progress.message(f"         ✗ API error after {max_retries} attempts: {track.name} – {track.artist_names}")
+                progress.record("missing", spotify_id=spotify_id, title=track.name, reason="rate_limited")
                 video_id = None
-                
-        except Exception as e:
-            # Other unexpected errors
-            artists = ", ".join(a["name"] for a in track.get("artists", []))
-            print(f"         ✗ Unexpected error searching for {track['name']} – {artists}: {e}")
-            video_id = None
-            break
-
-    # Save to state
-    state["song_cache"][cache_key] = {
-        "videoId": video_id,
-        "found": video_id is not None,
-        "spotify_id": track.get("id"),
-        "last_searched": datetime.now().isoformat(),
-        "attempts": max_retries if video_id is None else 1
-    }
+                miss_reason = "api_error"
+
+    # Save to cache and state
+    cache.store_result(
+        spotify_id,
+        isrc,
+        cache_key,
+        video_id,
+        attempts=max_retries if video_id is None else 1,
+        miss_reason=miss_reason,
+    )
     
-    # If not found, add to failed songs
+    # If not found, count it in the failure ledger; a match clears it
     if video_id is None:
-        artists = ", ".join(a["name"] for a in track.get("artists", []))
-        state["failed_songs"].append({
-            "title": track["name"],
-            "artist": artists,
-            "album": track.get("album", {}).get("name", ""),
-            "spotify_id": track.get("id"),
-            "playlist": playlist_name,
-            "failed_at": datetime.now().isoformat()
-        })
-
-    cache[key] = video_id
-    time.sleep(SEARCH_SLEEP_SECONDS)
+        attempts = state.record_failure(spotify_id or cache_key, track.name, track.artist_names, track.album,
+                                        miss_reason)
+        failure_log.write(spotify_id=spotify_id, title=track.name, artist=track.artist_names, album=track.album,
+                          playlist=playlist_name or None, reason=miss_reason, attempts=attempts)
+    else:
+        state.remove_failure(spotify_id or cache_key)
+
     return video_id
 
 
-def create_yt_playlist(yt: YTMusic, name: str, description: str) -> str:
+def stream_resolve_tracks(
+    yt: YTMusic,
+    tracks: Iterable[Track],
+    cache: MatchCache,
+    state: MigrationStateStore,
+    playlist_name: str = "",
+    total: Optional[int] = None,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    count_lookups: bool = True
+) -> Iterator[Tuple[Track, Optional[str]]]:
+    """
+    Yields (track, videoId or None) for every track, in playlist order, as
+    soon as it is resolved. Tracks are pulled from `tracks` only when a worker
+    slot frees up, so a lazy track iterator keeps fetching pages while
+    searches are running and at most a small window is held in memory.
+    Once the consumer has handled a result, it counts towards the next
+    state checkpoint, and BudgetExhausted is raised if the run budget is
+    spent. `workers` defaults to SEARCH_WORKERS.
+    """
+    if workers is None:
+        workers = SEARCH_WORKERS
+
+    def handled():
+        checkpoints.tick(state)
+        run_budget.check()
+
+    def resolve(item: Tuple[int, Track]) -> Tuple[Track, Optional[str]]:
+        idx, t = item
+        if progress.verbose:
+            progress.message(f"\n  [{idx}/{total or '?'}] 🔍 Searching: {t.name} - {t.artist_names}")
+        video_id = find_ytmusic_song(yt, t, cache, state, playlist_name, use_cache=use_cache,
+                                     count_lookup=count_lookups)
+        progress.record("resolved", log=False)  # The outcome was logged by find_ytmusic_song
+        return t, video_id
+
+    if workers <= 1:
+        for item in enumerate(tracks, 1):
+            yield resolve(item)
+            handled()
+        return
+
+    window = workers * RESOLVE_WINDOW_PER_WORKER
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for item in enumerate(tracks, 1):
+                pending.append(pool.submit(resolve, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+                    handled()
+            while pending:
+                yield pending.popleft().result()
+                handled()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def resolve_tracks(
+    yt: YTMusic,
+    tracks: List[Track],
+    cache: MatchCache,
+    state: MigrationStateStore,
+    playlist_name: str = "",
+    workers: Optional[int] = None
+) -> List[Optional[str]]:
+    """
+    Returns a videoId (or None) for every track, in playlist order.
+    With more than one worker, searches run concurrently while the shared
+    search limiter keeps the overall request rate in check.
+    """
+    return [vid for _, vid in stream_resolve_tracks(yt, tracks, cache, state, playlist_name, len(tracks), workers)]
+
+
+def create_yt_playlist(yt: YTMusic, name: str, description: str,
+                       video_ids: Optional[List[str]] = None) -> Tuple[str, List[str]]:
+    """
+    Creates a private playlist. With `video_ids` the first tracks are sent
+    in the creation request itself, saving the separate add. If the service
+    rejects that request as invalid (e.g. an unavailable videoId), the
+    playlist is created empty and the caller adds the tracks in batches
+    instead. After any other error the library is checked first, since
+    the playlist may have been created despite the error.
+    Returns (playlist_id, videoIds the playlist was created with).
+    """
     # YouTube max title length is 150 chars
     if len(name) > 150:
-        print(f"  ⚠ Truncating playlist name from {len(name)} to 150 chars")
+        progress.message(f"  ⚠ Truncating playlist name from {len(name)} to 150 chars")
         name = name[:150]
 
     max_retries = 3
+    if video_ids:
+        for attempt in range(max_retries):
+            try:
+                write_limiter.acquire()
+                playlist_id = yt.create_playlist(
+                    title=name,
+                    description=description,
+                    privacy_status="PRIVATE",
+                    video_ids=video_ids,
+                )
+                write_limiter.record_success()
+                if not isinstance(playlist_id, str):
+                    # ytmusicapi returns the raw response when it has no playlistId
+                    raise Exception(f"Unexpected response: {playlist_id}")
+                return playlist_id, list(video_ids)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    progress.message(f"  ⚠ Creating playlist '{name}' with {len(video_ids)} tracks failed ({e})")
+                    if not _is_invalid_argument_error(e):
+                        playlist_id = _find_created_playlist(yt, name)
+                        if playlist_id:
+                            created_with = get_ytmusic_playlist_tracks(yt, playlist_id)
+                            return playlist_id, [vid for vid in video_ids if vid in created_with]
+                    progress.message("    → Creating it empty and adding the tracks in batches")
+                    break
+                new_rate = write_limiter.record_throttle()
+                if attempt < max_retries - 1:
+                    metrics.record_retry("yt.create_playlist")
+                    progress.message(f"  ⚠ Rate limit hit creating playlist, slowing to {new_rate:.2f} req/s and retrying...")
+                    continue
+                progress.message(f"  ✗ Failed to create playlist '{name}' after {max_retries} attempts (Rate Limit)")
+                raise e
+
     for attempt in range(max_retries):
         try:
+            write_limiter.acquire()
             playlist_id = yt.create_playlist(
                 title=name,
                 description=description,
                 privacy_status="PRIVATE",
             )
-            return playlist_id
-        except json.decoder.JSONDecodeError as e:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                print(f"  ⚠ Rate limit hit creating playlist, retrying in {wait_time}s...")
-                time.sleep(wait_time)
-            else:
-                print(f"  ✗ Failed to create playlist '{name}' after {max_retries} attempts (Rate Limit)")
-                raise e
+            write_limiter.record_success()
+            return playlist_id, []
         except Exception as e:
+            if is_rate_limit_error(e):
+                new_rate = write_limiter.record_throttle()
+                if attempt < max_retries - 1:
+                    metrics.record_retry("yt.create_playlist")
+                    progress.message(f"  ⚠ Rate limit hit creating playlist, slowing to {new_rate:.2f} req/s and retrying...")
+                    continue
+                progress.message(f"  ✗ Failed to create playlist '{name}' after {max_retries} attempts (Rate Limit)")
+                raise e
+
             # If it's a 400 Bad Request, retrying the exact same thing won't help unless we change something
             # But sometimes it's transient?
-            error_str = str(e)
-            if "400" in error_str and "invalid argument" in error_str.lower():
-                print(f"  ✗ Invalid argument error for playlist '{name}'")
-                print(f"    Description length: {len(description)}")
+            if _is_invalid_argument_error(e):
+                progress.message(f"  ✗ Invalid argument error for playlist '{name}'")
+                progress.message(f"    Description length: {len(description)}")
                 # Try one fallback: empty description, strict name sanitization
                 if attempt == 0:
-                     print("    → Retrying with empty description and sanitized name...")
+                     progress.message("    → Retrying with empty description and sanitized name...")
                      description = ""
                      original_name = name
                      name = "".join(c for c in name if c.isalnum() or c in " -_").strip()
-                     print(f"    → Sanitized name: '{name}'")
+                     progress.message(f"    → Sanitized name: '{name}'")
                      
                      if not name:
                          name = f"Imported Playlist {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-                         print(f"    → Sanitized name was empty, using fallback: '{name}'")
+                         progress.message(f"    → Sanitized name was empty, using fallback: '{name}'")
+                     metrics.record_retry("yt.create_playlist")
                      continue
             
-            print(f"  ✗ Creating playlist '{name}' failed: {e}")
+            progress.message(f"  ✗ Creating playlist '{name}' failed: {e}")
             if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
+                metrics.record_retry("yt.create_playlist")
+                metrics.sleep("backoff.create_playlist", 2 ** attempt)
             else:
-                print(f"  ! Checking if playlist was actually created despite error...")
-                # Search for it just in case
-                try:
-                    results = yt.get_library_playlists(limit=20)
-                    for pl in results:
-                        if pl['title'] == name:
-                            print(f"  ✓ Found playlist '{name}' despite error!")
-                            return pl['playlistId']
-                except:
-                    pass
+                playlist_id = _find_created_playlist(yt, name)
+                if playlist_id:
+                    return playlist_id, []
                 raise e
-    return ""
+    return "", []
 
 
-def add_tracks_to_yt_playlist(yt: YTMusic, playlist_id: str, video_ids: List[str]) -> None:
-    # ytmusicapi lets you add up to 50 items at a time
-    chunk_size = 50
-    for i in range(0, len(video_ids), chunk_size):
-        chunk = video_ids[i:i + chunk_size]
-        
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                yt.add_playlist_items(playlist_id, chunk)
-                break
-            except json.decoder.JSONDecodeError as e:
+def _is_invalid_argument_error(e: Exception) -> bool:
+    """HTTP 400 "invalid argument": the request was refused, nothing was created."""
+    error_str = str(e)
+    return "400" in error_str and "invalid argument" in error_str.lower()
+
+
+def _find_created_playlist(yt: YTMusic, name: str) -> Optional[str]:
+    """
+    Looks for a playlist called `name` among the most recent library
+    playlists, for a create request that failed on the client side (e.g.
+    a read timeout) after the service had already created it.
+    """
+    progress.message(f"  ! Checking if playlist was actually created despite error...")
+    try:
+        read_limiter.acquire()
+        results = yt.get_library_playlists(limit=20)
+    except Exception:
+        return None
+    for pl in results:
+        if pl['title'] == name:
+            progress.message(f"  ✓ Found playlist '{name}' despite error!")
+            return pl['playlistId']
+    return None
+
+
+def _add_batch(yt: YTMusic, playlist_id: str, batch: List[str]) -> Optional[Exception]:
+    """
+    Sends one add request, retrying when throttled. Returns None once the
+    batch is added, or the error that rejected it; a response without a
+    SUCCEEDED status counts as a rejection. Errors other than
+    throttling are retried for single items only; larger batches are
+    split by the caller instead.
+    """
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            write_limiter.acquire()
+            response = yt.add_playlist_items(playlist_id, batch)
+            write_limiter.record_success()
+            # ytmusicapi returns the raw response instead of raising when the edit is not applied
+            status = response.get("status", "") if isinstance(response, dict) else ""
+            if "SUCCEEDED" not in status:
+                raise Exception(f"Add not applied ({status or 'no status'})")
+            return None
+        except Exception as e:
+            if is_rate_limit_error(e):
+                new_rate = write_limiter.record_throttle()
                 if attempt < max_retries - 1:
-                    wait_time = 2 ** attempt
-                    print(f"  ⚠ Rate limit hit adding tracks, retrying in {wait_time}s...")
-                    time.sleep(wait_time)
+                    metrics.record_retry("yt.add_playlist_items")
+                    progress.message(f"  ⚠ Rate limit hit adding tracks, slowing to {new_rate:.2f} req/s and retrying...")
                 else:
-                    print(f"  ✗ Failed to add tracks after {max_retries} attempts")
+                    progress.message(f"  ✗ Failed to add tracks after {max_retries} attempts")
+                    return e
+                continue
+            if len(batch) > 1 or attempt == max_retries - 1:
+                return e
+            metrics.record_retry("yt.add_playlist_items")
+            metrics.sleep("backoff.add_playlist_items", 2 ** attempt)
+    return None
+
+
+def add_tracks_to_yt_playlist(yt: YTMusic, playlist_id: str,
+                              video_ids: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Adds tracks in batches of `add_batch_size`, in order. A batch that fails
+    for any reason other than throttling is bisected until the videoIds the
+    service rejects are isolated, so one unavailable video costs a few extra
+    requests instead of the whole batch.
+    Returns (videoIds added, {videoId: error} for the ones rejected).
+    """
+    added: List[str] = []
+    rejected: Dict[str, str] = {}
+    i = 0
+    while i < len(video_ids):
+        chunk = video_ids[i:i + add_batch_size.size]
+        i += len(chunk)
+        stack = [chunk]  # Halves are pushed right first, so they are added in order
+        while stack:
+            batch = stack.pop()
+            error = _add_batch(yt, playlist_id, batch)
+            if error is None:
+                add_batch_size.record_success(len(batch))
+                added.extend(batch)
+            elif len(batch) > 1 and not is_rate_limit_error(error):
+                if batch is chunk:
+                    new_size = add_batch_size.record_failure()
+                    progress.message(f"  ⚠ Add of {len(batch)} tracks failed ({error}), "
+                                     f"splitting it; batch size now {new_size}")
+                metrics.incr("add_bisections")
+                mid = len(batch) // 2
+                stack.append(batch[mid:])
+                stack.append(batch[:mid])
+            else:
+                for vid in batch:
+                    rejected[vid] = str(error)
+                if len(batch) == 1:
+                    progress.message(f"  ✗ YouTube Music rejected {batch[0]}: {error}")
+    return added, rejected
+
+
+class PlaylistWriter:
+    """
+    Final pipeline stage: adds videoIds to a YouTube Music playlist from a
+    background thread, one batch as soon as it fills up, so adds overlap
+    with searching. The playlist is created on the first flush if it does
+    not exist yet, with the first batch included in the creation request.
+    A small bounded queue keeps memory flat if adds fall behind. Added
+    tracks are written through to the local library mirror; tracks
+    YouTube Music rejects are recorded as unmatched entries of the
+    playlist, so `--retry-failed` adds them later.
+    """
+
+    def __init__(self, yt: YTMusic, state: MigrationStateStore, name: str, description: str,
+                 playlist_id: Optional[str] = None, batch_size: Optional[int] = None):
+        self.yt = yt
+        self.state = state
+        self.name = name
+        self.description = description
+        self.playlist_id = playlist_id
+        self.batch_size = batch_size or ADD_BATCH_SIZE
+        self.added = 0
+        self.error: Optional[Exception] = None
+        self.rejected = 0
+        self._batch: List[str] = []
+        self._tracks: Dict[str, Track] = {}
+        self._queue: queue.Queue = queue.Queue(maxsize=4)
+        self._thread = threading.Thread(target=self._run, name=f"writer-{name}", daemon=True)
+        self._thread.start()
+
+    def add(self, video_id: str, track: Optional[Track] = None):
+        self._batch.append(video_id)
+        if track is not None:
+            self._tracks[video_id] = track
+        if len(self._batch) >= self.batch_size:
+            self._queue.put(self._batch)
+            self._batch = []
+
+    def close(self) -> Optional[str]:
+        """Flushes the last partial batch and waits for all adds to finish."""
+        if self._batch:
+            self._queue.put(self._batch)
+            self._batch = []
+        self._queue.put(None)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.playlist_id
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self.error is not None:
+                continue  # Drain the queue after a fatal error
+            try:
+                if self.playlist_id is None:
+                    self.playlist_id, included = create_yt_playlist(self.yt, self.name, self.description, batch)
+                    self.state.replace_mirrored_yt_playlist(self.playlist_id, included, len(included), self.name)
+                    progress.message(f"  → Created YT Music playlist {self.playlist_id}"
+                                     + (f" with {len(included)} tracks" if included else ""))
+                    if included:
+                        self._record_added(included)
+                        batch = batch[len(included):]
+                        if not batch:
+                            continue
+                added, rejected = add_tracks_to_yt_playlist(self.yt, self.playlist_id, batch)
+                self.state.add_mirrored_yt_items(self.playlist_id, added)
+                self._record_added(added)
+                for vid, error in rejected.items():
+                    self._reject(vid, error)
             except Exception as e:
-                print(f"  ✗ Unexpected error adding tracks: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
-                else:
-                    break
-                    
-        time.sleep(ADD_SLEEP_SECONDS)
+                self.error = e
+
+    def _record_added(self, video_ids: List[str]):
+        self.added += len(video_ids)
+        progress.record("added", len(video_ids), playlist_id=self.playlist_id, video_ids=video_ids)
+        added_tracks = [self._tracks.pop(vid, None) for vid in video_ids]
+        # Clears failures of tracks that were rejected by an earlier add
+        self.state.remove_failures(t.id for t in added_tracks if t is not None)
+
+    def _reject(self, video_id: str, error: str):
+        self.rejected += 1
+        progress.record("rejected", playlist_id=self.playlist_id, video_id=video_id, error=error)
+        t = self._tracks.pop(video_id, None)
+        if t is None:
+            return
+        self.state.add_unmatched_entry(t.id, self.name, t.name, t.artist_names, t.album, t.isrc)
+        attempts = self.state.record_failure(t.id, t.name, t.artist_names, t.album, "add_rejected")
+        failure_log.write(spotify_id=t.id, title=t.name, artist=t.artist_names, album=t.album,
+                          playlist=self.name, reason="add_rejected", video_id=video_id, error=error,
+                          attempts=attempts)
 
 
 # ----- MIGRATION LOGIC -----
 
+class MigrationPlan:
+    """
+    Every track the run will touch, fetched up front, plus the set of
+    unique tracks (by Spotify id) that actually need resolving.
+    """
+
+    def __init__(self):
+        self.playlist_tracks: Dict[str, List[Track]] = {}
+        self.liked_tracks: Optional[List[Track]] = None
+        # Spotify id -> (track, name of the first playlist it appears in)
+        self.unique_tracks: Dict[str, Tuple[Track, str]] = {}
+        self.total_entries = 0
+
+    def _collect(self, tracks: List[Track], playlist_name: str):
+        self.total_entries += len(tracks)
+        for t in tracks:
+            if t.id not in self.unique_tracks:
+                self.unique_tracks[t.id] = (t, playlist_name)
+
+    def add_playlist(self, playlist_id: str, playlist_name: str, tracks: List[Track]):
+        self.playlist_tracks[playlist_id] = tracks
+        self._collect(tracks, playlist_name)
+
+    def add_liked(self, tracks: List[Track], playlist_name: str):
+        self.liked_tracks = tracks
+        self._collect(tracks, playlist_name)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Playlist entries per unique track (how many searches dedup saves)."""
+        return self.total_entries / len(self.unique_tracks) if self.unique_tracks else 1.0
+
+
+def _will_skip(name: str, existing_playlists: Dict[str, str]) -> bool:
+    return name in existing_playlists and DUPLICATE_MODE == "skip"
+
+
+def playlists_due_for_retry(cache: MatchCache, state: MigrationStateStore) -> Set[str]:
+    """Names of playlists with an unmatched track whose cached miss has expired."""
+    due: Set[str] = set()
+    expired: Dict[str, bool] = {}
+    for entry in state.iter_unmatched_entries():
+        if entry["playlist"] in due:
+            continue
+        spotify_id = entry["spotify_id"]
+        if spotify_id not in expired:
+            cached = state.get_song_by_spotify_id(spotify_id)
+            expired[spotify_id] = cached is None or cache.is_expired(cached)
+        if expired[spotify_id]:
+            due.add(entry["playlist"])
+    return due
+
+
+def is_playlist_unchanged(playlist: dict, state: MigrationStateStore,
+                          existing_playlists: Dict[str, str],
+                          due_for_retry: Set[str] = frozenset()) -> bool:
+    """
+    True if the playlist was migrated before from the same Spotify snapshot
+    and the YT Music playlist it went into is still in the library, and
+    none of its unmatched tracks is due for another search (`due_for_retry`,
+    see playlists_due_for_retry()).
+    """
+    snapshot_id = playlist.get("snapshot_id")
+    if not snapshot_id or playlist["name"] in due_for_retry:
+        return False
+    synced = state.get_completed_playlist(playlist["id"])
+    if not synced or synced["snapshot_id"] != snapshot_id:
+        return False
+    yt_playlist_id = synced["yt_playlist_id"]
+    return yt_playlist_id is None or yt_playlist_id in existing_playlists.values()
+
+
+def plan_migration(sp: spotipy.Spotify, playlists: List[dict],
+                   existing_playlists: Dict[str, str],
+                   state: MigrationStateStore,
+                   liked_playlist_name: Optional[str] = None) -> MigrationPlan:
+    """Enumerates every playlist and liked track the run will migrate."""
+    liked_playlist_name = liked_playlist_name or LIKED_SONGS_PLAYLIST_NAME
+    plan = MigrationPlan()
+    for pl in playlists:
+        if _will_skip(pl["name"], existing_playlists):
+            continue
+        plan.add_playlist(pl["id"], pl["name"], get_playlist_tracks(sp, pl["id"]))
+    if not _will_skip(liked_playlist_name, existing_playlists):
+        since = liked_high_water_mark(state, existing_playlists)
+        plan.add_liked(get_liked_tracks(sp, since), liked_playlist_name)
+    return plan
+
+
+def resolve_plan(yt: YTMusic, plan: MigrationPlan,
+                 cache: MatchCache,
+                 state: MigrationStateStore) -> None:
+    """
+    Resolves every unique track in the plan exactly once, filling `cache`
+    so the per-playlist pass afterwards makes no searches of its own.
+    Failures are attributed to the first playlist a track appears in.
+    """
+    unique = len(plan.unique_tracks)
+    uncached = sum(
+        1 for t, _ in plan.unique_tracks.values()
+        if not cache.contains(t.id, t.isrc, spotify_track_cache_key(t))
+    )
+    progress.message(f"\n=== Planning ===")
+    progress.message(f"  Playlist entries: {plan.total_entries}")
+    progress.message(f"  Unique tracks: {unique} ({plan.dedup_ratio:.2f} entries per unique track)")
+    progress.message(f"  Not cached yet (searches needed): {uncached}")
+
+    progress.start_stage("Planning", unique)
+    by_playlist: Dict[str, List[Track]] = {}
+    for t, playlist_name in plan.unique_tracks.values():
+        by_playlist.setdefault(playlist_name, []).append(t)
+    for playlist_name, tracks in by_playlist.items():
+        resolve_tracks(yt, tracks, cache, state, playlist_name)
+
+# ----- SCHEDULING -----
+
+LIKED_WORK_KEY = "liked"  # WorkItem key of Liked Songs (never a Spotify playlist id)
+
+
+def _estimate_writes(item: WorkItem, yt_playlist_id: Optional[str], state: MigrationStateStore):
+    """Fills in the writes (and reads) needed to put `item.tracks` songs on YT Music."""
+    if yt_playlist_id is None:
+        # The first batch goes out with create_playlist
+        item.writes = -(-item.tracks // ADD_BATCH_SIZE)
+        return
+    mirrored = state.get_mirrored_yt_playlist(yt_playlist_id)
+    if mirrored is None:
+        item.reads = 1  # Merge mode downloads the playlist first
+    item.writes = -(-max(0, item.tracks - len(mirrored or ())) // ADD_BATCH_SIZE)
+
+
+def schedule_work(sp: spotipy.Spotify, playlists: List[dict], plan: Optional[MigrationPlan],
+                  cache: MatchCache, state: MigrationStateStore,
+                  existing_playlists: Dict[str, str]) -> List[WorkItem]:
+    """
+    Returns a WorkItem per playlist plus Liked Songs, in RUN_PRIORITY order,
+    with the YouTube Music calls each is expected to need. With a plan, a
+    search is counted for every uncached unique track, against the first
+    item that contains it. Without one, playlist sizes come from the
+    playlist listing and searches from the previous run's cache hit rate.
+    """
+    carried = set(json.loads(state.get_meta("queued_work") or "[]"))
+    hit_rate = float(state.get_meta("cache_hit_rate") or 0.0)
+    items: List[WorkItem] = []
+
+    def add_item(key: str, name: str, tracks: Optional[List[Track]], total: int,
+                 yt_playlist_id: Optional[str], liked: bool = False):
+        if _will_skip(name, existing_playlists):
+            tracks, total = None, 0
+        modified = max((t.added_at for t in tracks or () if t.added_at), default=None)
+        item = WorkItem(key, name, len(tracks) if tracks is not None else total, liked,
+                        modified, key in carried, tracks)
+        _estimate_writes(item, yt_playlist_id, state)
+        items.append(item)
+
+    for pl in playlists:
+        tracks = plan.playlist_tracks.get(pl["id"]) if plan is not None else None
+        total = (pl.get("tracks") or {}).get("total") or 0
+        add_item(pl["id"], pl["name"], tracks, total, existing_playlists.get(pl["name"]))
+
+    since = liked_high_water_mark(state, existing_playlists)
+    liked_total = 0
+    if plan is None and since is None and not _will_skip(LIKED_SONGS_PLAYLIST_NAME, existing_playlists):
+        liked_total = sp.current_user_saved_tracks(limit=1).get("total", 0)
+    add_item(LIKED_WORK_KEY, LIKED_SONGS_PLAYLIST_NAME, plan.liked_tracks if plan is not None else None,
+             liked_total, since["yt_playlist_id"] if since else existing_playlists.get(LIKED_SONGS_PLAYLIST_NAME),
+             liked=True)
+
+    uncached = {
+        t.id for t, _ in plan.unique_tracks.values()
+        if not cache.contains(t.id, t.isrc, spotify_track_cache_key(t))
+    } if plan is not None else set()
+
+    def count_searches(ordered: List[WorkItem]):
+        seen: Set[str] = set()
+        for item in ordered:
+            if item.payload is None:
+                item.searches = round(item.tracks * (1.0 - hit_rate))
+                continue
+            ids = {t.id for t in item.payload} - seen
+            seen |= ids
+            item.searches = len(ids & uncached)
+
+    count_searches(items)  # Sizes for "smallest_first"
+    ordered = order_work(items, RUN_PRIORITY)
+    count_searches(ordered)
+    return ordered
+
+
+def plan_for_work(items: List[WorkItem]) -> MigrationPlan:
+    """The part of the plan covering `items`, in their order."""
+    plan = MigrationPlan()
+    for item in items:
+        if item.payload is None:
+            continue
+        if item.liked:
+            plan.add_liked(item.payload, item.name)
+        else:
+            plan.add_playlist(item.key, item.name, item.payload)
+    return plan
+
+
+def stream_tracks_to_playlist(
+    yt: YTMusic,
+    tracks: Iterable[Track],
+    total: int,
+    cache: MatchCache,
+    state: MigrationStateStore,
+    name: str,
+    description: str,
+    yt_playlist_id: Optional[str],
+    existing_video_ids: Set[str],
+    planned: bool = False
+) -> Tuple[int, int, int, Optional[str]]:
+    """
+    Runs the fetch → resolve → add pipeline for one playlist.
+    Unmatched tracks, and tracks YouTube Music rejected, are recorded for
+    `--retry-failed` and count as missing. `planned` tracks were already
+    looked up by resolve_plan(), so they are not counted in the hit rate
+    again.
+    Returns (added, missing, skipped, yt_playlist_id).
+    """
+    writer = PlaylistWriter(yt, state, name, description, yt_playlist_id)
+    missing = 0
+    skipped = 0
+    try:
+        for t, vid in stream_resolve_tracks(yt, tracks, cache, state, name, total, count_lookups=not planned):
+            metrics.incr("tracks_processed")
+            if not vid:
+                missing += 1
+                # Logging already handled in find_ytmusic_song
+                state.add_unmatched_entry(t.id, name, t.name, t.artist_names, t.album, t.isrc)
+                continue
+
+            # Skip if song already exists in playlist (for merge mode)
+            if vid in existing_video_ids:
+                progress.record("skipped", line="         ⏭️  Already in playlist", video_id=vid)
+                skipped += 1
+                continue
+
+            # Repeated songs within one Spotify playlist are added once
+            existing_video_ids.add(vid)
+            writer.add(vid, t)
+    finally:
+        writer.close()
+        metrics.incr("tracks_added", writer.added)
+        metrics.incr("tracks_rejected", writer.rejected)
+        metrics.incr("tracks_missing", missing)
+        metrics.incr("tracks_skipped", skipped)
+    return writer.added, missing + writer.rejected, skipped, writer.playlist_id
+
+
 def migrate_single_playlist(sp: spotipy.Spotify, yt: YTMusic, playlist: dict,
-                            cache: Dict[Tuple[str, str], Optional[str]],
+                            cache: MatchCache,
                             existing_playlists: Dict[str, str],
-                            state: dict) -> None:
+                            state: MigrationStateStore,
+                            planned_tracks: Optional[List[Track]] = None) -> Optional[str]:
+    """
+    Migrates one Spotify playlist. Returns the YT Music playlist id it was
+    written to, or None if no playlist was created.
+    """
     name = playlist["name"]
     description = (playlist.get("description") or "") + " (imported from Spotify)"
-    print(f"\n=== Migrating playlist: {name} ===")
-
-    tracks = get_playlist_tracks(sp, playlist["id"])
-    print(f"  Spotify tracks: {len(tracks)}")
+    progress.message(f"\n=== Migrating playlist: {name} ===")
 
     # Check if playlist already exists (exact name match)
     existing_video_ids: Set[str] = set()
@@ -452,189 +1523,365 @@ def migrate_single_playlist(sp: spotipy.Spotify, yt: YTMusic, playlist: dict,
     
     if name in existing_playlists:
         yt_playlist_id = existing_playlists[name]
-        print(f"  ℹ️  Playlist already exists: {yt_playlist_id}")
+        progress.message(f"  ℹ️  Playlist already exists: {yt_playlist_id}")
         
         if DUPLICATE_MODE == "skip":
-            print(f"  ⏭️  Skipping (duplicate mode: skip)")
-            return
+            progress.message(f"  ⏭️  Skipping (duplicate mode: skip)")
+            return yt_playlist_id
         elif DUPLICATE_MODE == "merge":
-            print(f"  🔄 Merging new songs into existing playlist")
-            existing_video_ids = get_ytmusic_playlist_tracks(yt, yt_playlist_id)
-            print(f"  📋 Found {len(existing_video_ids)} existing songs")
+            progress.message(f"  🔄 Merging new songs into existing playlist")
+            existing_video_ids = get_ytmusic_playlist_tracks(yt, yt_playlist_id, state)
+            progress.message(f"  📋 Found {len(existing_video_ids)} existing songs")
 
-    video_ids: List[str] = []
-    missing = 0
+    if planned_tracks is not None:
+        total, tracks = len(planned_tracks), iter(planned_tracks)
+    else:
+        total, tracks = stream_playlist_tracks(sp, playlist["id"])
+    progress.message(f"  Spotify tracks: {total}")
+    progress.start_stage(name, total)
+    state.clear_unmatched_entries(name)  # Re-recorded by the full pass below
 
-    for idx, t in enumerate(tracks, 1):
-        title = t['name']
-        artists = ", ".join(a["name"] for a in t.get("artists", []))
-        
-        # Show detailed progress
-        print(f"\n  [{idx}/{len(tracks)}] 🔍 Searching: {title} - {artists}")
-        
-        vid = find_ytmusic_song(yt, t, cache, state, name)
-        
-        if not vid:
-            missing += 1
-            # Logging already handled in find_ytmusic_song
-            continue
-        
-        # Skip if song already exists in playlist (for merge mode)
-        if vid in existing_video_ids:
-            print(f"         ⏭️  Already in playlist")
-            continue
-            
-        video_ids.append(vid)
+    # New playlists are created on the first batch of matches
+    added, missing, skipped, yt_playlist_id = stream_tracks_to_playlist(
+        yt, tracks, total, cache, state, name, description, yt_playlist_id, existing_video_ids,
+        planned=planned_tracks is not None
+    )
 
     # Filter summary for merge mode
-    if existing_video_ids and DUPLICATE_MODE == "merge":
-        skipped = len(tracks) - missing - len(video_ids)
-        if skipped > 0:
-            print(f"  ℹ️  Skipping {skipped} songs already in playlist")
+    if skipped > 0:
+        progress.message(f"  ℹ️  Skipped {skipped} songs already in playlist")
 
-    if not video_ids:
+    if not added:
         if existing_video_ids:
-            print(f"  ✓ No new songs to add")
+            progress.message(f"  ✓ No new songs to add")
         else:
-            print(f"  No matches found, skipping playlist.")
-        return
+            progress.message(f"  No matches found, skipping playlist.")
+        return yt_playlist_id
 
-    # Create new playlist or add to existing
-    if yt_playlist_id is None:
-        yt_playlist_id = create_yt_playlist(yt, name, description)
-        print(f"  → Created YT Music playlist {yt_playlist_id}")
-    else:
-        print(f"  → Adding {len(video_ids)} new songs to existing playlist")
-    
-    add_tracks_to_yt_playlist(yt, yt_playlist_id, video_ids)
-    print(f"  ✓ Added {len(video_ids)} tracks (missing {missing})")
+    progress.message(f"  ✓ Added {added} tracks (missing {missing})")
+    return yt_playlist_id
 
 
 
 def migrate_liked_songs(
     sp: spotipy.Spotify,
     yt: YTMusic,
-    cache: Dict[Tuple[str, str], Optional[str]],
+    cache: MatchCache,
     existing_playlists: Dict[str, str],
-    state: dict,
-    playlist_name: str = "Spotify Liked Songs"
-) -> None:
-    print("\n=== Migrating Spotify Liked Songs ===")
-    tracks = get_liked_tracks(sp)
-    print(f"  Spotify liked tracks: {len(tracks)}")
+    state: MigrationStateStore,
+    playlist_name: Optional[str] = None,
+    planned_tracks: Optional[List[Track]] = None
+) -> Optional[str]:
+    """
+    Migrates Liked Songs into one playlist. After the first full sync only
+    songs liked since the last run are fetched and added.
+    Returns the YT Music playlist id, or None if none was created.
+    """
+    playlist_name = playlist_name or LIKED_SONGS_PLAYLIST_NAME
+    progress.message("\n=== Migrating Spotify Liked Songs ===")
 
     # Check if playlist already exists
     existing_video_ids: Set[str] = set()
     yt_playlist_id: Optional[str] = None
+    since = liked_high_water_mark(state, existing_playlists)
     
-    if playlist_name in existing_playlists:
+    if since is not None:
+        yt_playlist_id = since["yt_playlist_id"]
+        progress.message(f"  🔄 Incremental sync: only songs liked after {since['added_at']}")
+        if DUPLICATE_MODE == "merge":
+            # Usually answered by the local mirror without any request
+            existing_video_ids = get_ytmusic_playlist_tracks(yt, yt_playlist_id, state)
+    elif playlist_name in existing_playlists:
         yt_playlist_id = existing_playlists[playlist_name]
-        print(f"  ℹ️  Playlist already exists: {yt_playlist_id}")
+        progress.message(f"  ℹ️  Playlist already exists: {yt_playlist_id}")
         
         if DUPLICATE_MODE == "skip":
-            print(f"  ⏭️  Skipping (duplicate mode: skip)")
-            return
+            progress.message(f"  ⏭️  Skipping (duplicate mode: skip)")
+            return yt_playlist_id
         elif DUPLICATE_MODE == "merge":
-            print(f"  🔄 Merging new songs into existing playlist")
-            existing_video_ids = get_ytmusic_playlist_tracks(yt, yt_playlist_id)
-            print(f"  📋 Found {len(existing_video_ids)} existing songs")
+            progress.message(f"  🔄 Merging new songs into existing playlist")
+            existing_video_ids = get_ytmusic_playlist_tracks(yt, yt_playlist_id, state)
+            progress.message(f"  📋 Found {len(existing_video_ids)} existing songs")
 
-    video_ids: List[str] = []
-    missing = 0
+    if planned_tracks is not None:
+        total, tracks = len(planned_tracks), iter(planned_tracks)
+    else:
+        total, tracks = stream_liked_tracks(sp, since)
+    if since is None:
+        progress.message(f"  Spotify liked tracks: {total}")
+        state.clear_unmatched_entries(playlist_name)  # Re-recorded by the full pass below
+    progress.start_stage(playlist_name, total if since is None else None)
 
-    for idx, t in enumerate(tracks, 1):
-        title = t['name']
-        artists = ", ".join(a["name"] for a in t.get("artists", []))
-        
-        # Show detailed progress
-        print(f"\n  [{idx}/{len(tracks)}] 🔍 Searching: {title} - {artists}")
-        
-        vid = find_ytmusic_song(yt, t, cache, state, playlist_name)
-        
-        if not vid:
-            missing += 1
-            # Logging already handled in find_ytmusic_song
-            continue
-        
-        # Skip if song already exists in playlist
-        if vid in existing_video_ids:
-            print(f"         ⏭️  Already in playlist")
-            continue
-            
-        video_ids.append(vid)
+    # Remember the newest songs seen; they become the next high-water mark
+    newest: List[Track] = []
+
+    def track_newest(tracks: Iterable[Track]) -> Iterator[Track]:
+        for t in tracks:
+            if not newest or t.added_at == newest[0].added_at:
+                newest.append(t)
+            yield t
+
+    # Create or update playlist
+    description = "Auto-imported from Spotify Liked Songs"
+    added, missing, skipped, yt_playlist_id = stream_tracks_to_playlist(
+        yt, track_newest(tracks), total, cache, state, playlist_name, description,
+        yt_playlist_id, existing_video_ids, planned=planned_tracks is not None
+    )
+
+    if yt_playlist_id and newest:
+        save_liked_high_water_mark(state, newest, yt_playlist_id)
+
+    if since is not None and not newest:
+        progress.message(f"  ✓ No new liked songs since last run")
+        return yt_playlist_id
 
     # Filter summary
-    if existing_video_ids and DUPLICATE_MODE == "merge":
-        skipped = len(tracks) - missing - len(video_ids)
-        if skipped > 0:
-            print(f"  ℹ️  Skipping {skipped} songs already in playlist")
+    if skipped > 0:
+        progress.message(f"  ℹ️  Skipped {skipped} songs already in playlist")
 
-    if not video_ids:
+    if not added:
         if existing_video_ids:
-            print(f"  ✓ No new songs to add")
+            progress.message(f"  ✓ No new songs to add")
         else:
-            print(f"  No liked songs matched, skipping.")
-        return
+            progress.message(f"  No liked songs matched, skipping.")
+        return yt_playlist_id
 
-    # Create or update playlist
-    description = "Auto-imported from Spotify Liked Songs"
-    if yt_playlist_id is None:
-        yt_playlist_id = create_yt_playlist(yt, playlist_name, description)
-        print(f"  → Created YT Music playlist {yt_playlist_id}")
-    else:
-        print(f"  → Adding {len(video_ids)} new songs to existing playlist")
-    
-    add_tracks_to_yt_playlist(yt, yt_playlist_id, video_ids)
-    print(f"  ✓ Added {len(video_ids)} liked songs (missing {missing})")
+    progress.message(f"  ✓ Added {added} liked songs (missing {missing})")
+    return yt_playlist_id
 
 
-def main():
-    print("Authorizing with Spotify...")
-    sp = get_spotify_client()
+def _track_from_unmatched(entry: dict) -> Track:
+    """Rebuilds a Track from an unmatched playlist entry."""
+    artists = tuple(a for a in (entry["artist"] or "").split(", ") if a)
+    return Track(entry["spotify_id"], entry["title"], artists, entry["album"] or "", entry["isrc"])
 
-    print("Authorizing with YouTube Music...")
-    yt = get_ytmusic_client()
+
+def retry_failed_songs(yt: YTMusic, cache: MatchCache, state: MigrationStateStore,
+                       existing_playlists: Dict[str, str]) -> Tuple[int, int]:
+    """
+    Re-resolves unmatched tracks whose cached miss has expired or came from
+    an API error, and adds new matches to every playlist that was missing
+    them. Spotify is not contacted. Returns (matched, still missing).
+    """
+    tracks: Dict[str, Track] = {}
+    targets: Dict[str, List[str]] = {}
+    for entry in state.iter_unmatched_entries():
+        tracks.setdefault(entry["spotify_id"], _track_from_unmatched(entry))
+        targets.setdefault(entry["spotify_id"], []).append(entry["playlist"])
+
+    matches: Dict[str, str] = {}
+    due: List[Track] = []
+    for spotify_id, track in tracks.items():
+        cached = state.get_song_by_spotify_id(spotify_id)
+        if cached is not None and cached["found"]:
+            matches[spotify_id] = cached["videoId"]  # Matched since, e.g. in another playlist
+        elif cached is None or cached.get("miss_reason") == "api_error" or cache.is_expired(cached):
+            due.append(track)
+
+    progress.message("\n=== Retrying failed songs ===")
+    progress.message(f"  Unmatched tracks: {len(tracks)} in {state.count_unmatched()} playlist entries")
+    progress.message(f"  Due for another search (expired or API error): {len(due)}")
+    progress.start_stage("Retry", len(due))
+    for t, vid in stream_resolve_tracks(yt, due, cache, state, "", len(due), use_cache=False):
+        if vid:
+            matches[t.id] = vid
+
+    by_playlist: Dict[str, List[Tuple[str, Track]]] = {}
+    for spotify_id, vid in matches.items():
+        for playlist_name in targets[spotify_id]:
+            by_playlist.setdefault(playlist_name, []).append((vid, tracks[spotify_id]))
+        state.remove_unmatched_entries(spotify_id)
+
+    for playlist_name, entries in by_playlist.items():
+        yt_playlist_id = existing_playlists.get(playlist_name)
+        existing_video_ids = get_ytmusic_playlist_tracks(yt, yt_playlist_id, state) if yt_playlist_id else set()
+        writer = PlaylistWriter(yt, state, playlist_name, "Auto-imported from Spotify", yt_playlist_id)
+        try:
+            for vid, t in entries:
+                if vid not in existing_video_ids:
+                    existing_video_ids.add(vid)
+                    writer.add(vid, t)
+        finally:
+            if writer.close():
+                existing_playlists[playlist_name] = writer.playlist_id
+        metrics.incr("tracks_added", writer.added)
+        metrics.incr("tracks_rejected", writer.rejected)
+        progress.message(f"  ✓ {playlist_name}: added {writer.added} previously missing songs"
+                         + (f" ({writer.rejected} rejected)" if writer.rejected else ""))
+
+    return len(matches), len(tracks) - len(matches)
+
+
+def migrate_library(sp: spotipy.Spotify, yt: YTMusic, cache: MatchCache,
+                    existing_playlists: Dict[str, str], state: MigrationStateStore) -> List[WorkItem]:
+    """
+    Migrates playlists and Liked Songs in RUN_PRIORITY order until the run
+    budget is spent. Returns what is left, queued for the next run.
+    """
+    playlists = get_all_spotify_playlists(sp)
+    progress.message(f"\nFound {len(playlists)} Spotify playlists.")
+
+    if INCREMENTAL_SYNC:
+        due_for_retry = playlists_due_for_retry(cache, state)
+        changed = [pl for pl in playlists
+                   if not is_playlist_unchanged(pl, state, existing_playlists, due_for_retry)]
+        unchanged = len(playlists) - len(changed)
+        if unchanged:
+            progress.message(f"  ⏭️  Skipping {unchanged} playlists unchanged since last run")
+        playlists = changed
+
+    plan: Optional[MigrationPlan] = None
+    if GLOBAL_DEDUP:
+        plan = plan_migration(sp, playlists, existing_playlists, state)
+
+    work = schedule_work(sp, playlists, plan, cache, state, existing_playlists)
+    selected = run_budget.select(work)
+    if run_budget.calls is not None or run_budget.seconds is not None:
+        progress.message(f"\n=== Schedule ===")
+        progress.message(f"  Estimated YT Music calls: {sum(item.calls for item in work)} for {len(work)} playlists")
+        if run_budget.calls is not None:
+            progress.message(f"  Call budget: {run_budget.remaining_calls} left, "
+                             f"{len(selected)} playlists fit ({sum(item.calls for item in selected)} calls)")
+
+    playlists_by_id = {pl["id"]: pl for pl in playlists}
+    done = 0
+    stopped: Optional[str] = None
+    try:
+        if plan is not None:
+            # Search every unique track once before building any playlist
+            resolve_plan(yt, plan_for_work(selected), cache, state)
+            save_migration_state(state)
+
+        for item in selected:
+            run_budget.check()
+            if item.liked:
+                migrate_liked_songs(sp, yt, cache, existing_playlists, state, item.name,
+                                    planned_tracks=item.payload)
+            else:
+                pl = playlists_by_id[item.key]
+                yt_playlist_id = migrate_single_playlist(sp, yt, pl, cache, existing_playlists, state,
+                                                         item.payload)
+                state.mark_playlist_completed(pl["id"], pl["name"], pl.get("snapshot_id"), yt_playlist_id)
+            save_migration_state(state)  # Save after each playlist
+            done += 1
+    except BudgetExhausted as e:
+        stopped = str(e)
+
+    # Playlists not reached were never marked completed; they go first next run
+    queued = work[done:]
+    state.set_meta("queued_work", json.dumps([item.key for item in queued]))
+    if queued:
+        names = ", ".join(item.name for item in queued[:5]) + (", ..." if len(queued) > 5 else "")
+        progress.message(f"\n⏸️  Stopped at the {stopped or 'call budget'}: "
+                         f"{len(queued)} playlists queued for the next run ({names})")
+    return queued
+
+
+def main(retry_failed: bool = False):
+    """
+    Runs a full migration, or with `retry_failed` only searches again for
+    songs that failed before and patches them into their playlists.
+    """
+    metrics.reset()
+    progress.reset(PROGRESS_MODE, PROGRESS_REFRESH_SECONDS, PROGRESS_LOG_SECONDS, EVENT_LOG_FILE)
+    checkpoints.reset(CHECKPOINT_EVERY_TRACKS, CHECKPOINT_EVERY_SECONDS)
+    run_budget.reset(RUN_CALL_BUDGET,
+                     RUN_TIME_BUDGET_MINUTES * 60 if RUN_TIME_BUDGET_MINUTES is not None else None,
+                     lambda: metrics.calls("yt."))
+    failure_log.open(FAILED_SONGS_LOG)
+    sp = None
+    if not retry_failed:
+        progress.message("Authorizing with Spotify...")
+        sp = metrics.instrument(get_spotify_client(), "spotify")
+
+    progress.message("Authorizing with YouTube Music...")
+    yt = metrics.instrument(get_ytmusic_client(), "yt")
     
     # Load previous state
-    print("Loading migration state...")
+    progress.message("Loading migration state...")
     state = load_migration_state()
+    load_learned_rates(state)
     
-    if state["last_updated"]:
-        print(f"  Found previous migration from {state['last_updated']}")
-        print(f"  Cached songs: {len(state['song_cache'])}")
-        print(f"  Failed songs: {len(state['failed_songs'])}")
+    if state.last_updated:
+        progress.message(f"  Found previous migration from {state.last_updated}")
+        progress.message(f"  Cached songs: {state.count_songs()}")
+        progress.message(f"  Failed songs: {state.count_failed()}")
+        progress.message(f"  Starting search rate: {search_limiter.rate:.2f}/s")
     
     # Fetch existing YouTube Music playlists for duplicate detection
-    print("Fetching existing YouTube Music playlists...")
-    existing_playlists = get_all_ytmusic_playlists(yt)
-    print(f"Found {len(existing_playlists)} existing playlists on YouTube Music")
-    print(f"Duplicate mode: {DUPLICATE_MODE}")
-
-    cache: Dict[Tuple[str, str], Optional[str]] = {}
-
-    # 1. Migrate playlists
-    playlists = get_all_spotify_playlists(sp)
-    print(f"\nFound {len(playlists)} Spotify playlists.")
-    for pl in playlists:
-        migrate_single_playlist(sp, yt, pl, cache, existing_playlists, state)
-        save_migration_state(state)  # Save after each playlist
-        save_failed_songs_readable(state)  # Update failed songs file
+    progress.message("Fetching existing YouTube Music playlists...")
+    existing_playlists = get_all_ytmusic_playlists(yt, state)
+    progress.message(f"Found {len(existing_playlists)} existing playlists on YouTube Music")
+    progress.message(f"Duplicate mode: {DUPLICATE_MODE}")
+
+    shared = SharedMatchStore(SHARED_MATCH_DB) if SHARED_MATCH_DB else None
+    if shared is not None:
+        progress.message(f"Shared match cache: {shared.count()} matches in {SHARED_MATCH_DB}")
+    miss_ttls = {"no_results": timedelta(days=NO_RESULTS_TTL_DAYS),
+                 "api_error": timedelta(hours=API_ERROR_TTL_HOURS)}
+    cache = MatchCache(state, shared, miss_ttls)
+
+    # On Ctrl+C or SIGTERM the playlist writers flush what they have and
+    # everything resolved so far is saved below, so a re-run resumes from here
+    interrupted = False
+    queued: List[WorkItem] = []
+    try:
+        with graceful_interrupts():
+            if retry_failed:
+                matched, still_missing = retry_failed_songs(yt, cache, state, existing_playlists)
+                progress.message(f"  Retry matched {matched} songs, {still_missing} still missing")
+            else:
+                queued = migrate_library(sp, yt, cache, existing_playlists, state)
+    except KeyboardInterrupt:
+        interrupted = True
+    except BudgetExhausted as e:
+        progress.message(f"\n⏸️  Stopped at the {e}; run again to continue")
 
-    # 2. Migrate liked songs
-    migrate_liked_songs(sp, yt, cache, existing_playlists, state)
-    
     # Final save
+    if cache.lookups:
+        state.set_meta("cache_hit_rate", f"{cache.hit_rate:.4f}")
     save_migration_state(state)
     save_failed_songs_readable(state)
+    write_run_report(state, cache)
+    progress.finish()
     
-    print("\n" + "=" * 70)
-    print(f"Migration complete!")
-    print(f"  Cached songs: {len(state['song_cache'])}")
-    print(f"  Failed songs: {len(state['failed_songs'])}")
-    if state['failed_songs']:
-        print(f"  See {FAILED_SONGS_FILE} for details")
-    print("=" * 70)
+    progress.message("\n" + "=" * 70)
+    if interrupted:
+        progress.message("Interrupted! Progress saved, run again to resume.")
+    elif queued:
+        progress.message(f"Run budget reached! {len(queued)} playlists queued, run again to continue.")
+    else:
+        progress.message("Retry complete!" if retry_failed else "Migration complete!")
+    progress.message(f"  Cached songs: {state.count_songs()}")
+    progress.message(f"  Cache hit rate: {cache.summary()}")
+    progress.message(f"  Failed songs: {state.count_failed()}")
+    if state.count_failed():
+        progress.message(f"  See {FAILED_SONGS_FILE} for details")
+    if RUN_REPORT_FILE:
+        progress.message(f"  Run report: {RUN_REPORT_FILE}")
+    progress.message("=" * 70)
+    progress.close()
+    failure_log.close()
+    if shared is not None:
+        shared.close()
+    state.close()
+    if interrupted:
+        raise SystemExit(130)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Migrate Spotify playlists and Liked Songs to YouTube Music.")
+    parser.add_argument("--batch", metavar="MANIFEST",
+                        help="migrate every account listed in a JSON manifest (see src/batch.py)")
+    parser.add_argument("--max-parallel", type=int, metavar="N",
+                        help=f"accounts migrated at the same time in batch mode (default: {BATCH_MAX_PARALLEL})")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="only search again for songs that were not found before "
+                             "(expired or API errors) and add new matches to their playlists")
+    args = parser.parse_args()
+
+    if args.batch:
+        from batch import run_batch
+        raise SystemExit(run_batch(args.batch, args.max_parallel, BATCH_MAX_PARALLEL,
+                                   retry_failed=args.retry_failed))
+    main(retry_failed=args.retry_failed)
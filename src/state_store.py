@@ -0,0 +1,477 @@
+"""
+SQLite-backed migration state.
+
+Replaces the old `.migration_state.json` file, which had to be rewritten in
+full after every playlist. Every resolved track is now a single-row upsert,
+and startup cost no longer depends on how many songs are cached.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+
+STATE_VERSION = "3.0.0"
+
+# Each entry upgrades the schema by one version (PRAGMA user_version).
+SCHEMA_MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS meta (
+        key   TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE TABLE IF NOT EXISTS song_cache (
+        cache_key     TEXT PRIMARY KEY,
+        video_id      TEXT,
+        found         INTEGER NOT NULL,
+        spotify_id    TEXT,
+        last_searched TEXT,
+        attempts      INTEGER NOT NULL DEFAULT 1
+    );
+    CREATE INDEX IF NOT EXISTS idx_song_cache_spotify_id ON song_cache (spotify_id);
+    CREATE TABLE IF NOT EXISTS completed_playlists (
+        playlist_id  TEXT PRIMARY KEY,
+        name         TEXT,
+        completed_at TEXT
+    );
+    CREATE TABLE IF NOT EXISTS failed_songs (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        title      TEXT,
+        artist     TEXT,
+        album      TEXT,
+        spotify_id TEXT,
+        playlist   TEXT,
+        failed_at  TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_failed_songs_spotify_id ON failed_songs (spotify_id);
+    """,
+    # v2: ISRC lookups for the multi-index match cache
+    """
+    ALTER TABLE song_cache ADD COLUMN isrc TEXT;
+    CREATE INDEX IF NOT EXISTS idx_song_cache_isrc ON song_cache (isrc);
+    """,
+    # v3: incremental sync by Spotify snapshot_id
+    """
+    ALTER TABLE completed_playlists ADD COLUMN snapshot_id TEXT;
+    ALTER TABLE completed_playlists ADD COLUMN yt_playlist_id TEXT;
+    """,
+    # v4: local mirror of the YouTube Music library
+    """
+    CREATE TABLE IF NOT EXISTS yt_playlists (
+        playlist_id    TEXT PRIMARY KEY,
+        title          TEXT,
+        library_count  INTEGER,
+        mirrored_count INTEGER,
+        refreshed_at   TEXT
+    );
+    CREATE TABLE IF NOT EXISTS yt_playlist_items (
+        playlist_id TEXT NOT NULL,
+        video_id    TEXT NOT NULL,
+        PRIMARY KEY (playlist_id, video_id)
+    ) WITHOUT ROWID;
+    """,
+    # v5: expiring negative cache entries and the playlist entries still waiting for a match
+    """
+    ALTER TABLE song_cache ADD COLUMN miss_reason TEXT;
+    ALTER TABLE song_cache ADD COLUMN expires_at TEXT;
+    CREATE TABLE IF NOT EXISTS unmatched_entries (
+        spotify_id TEXT NOT NULL,
+        playlist   TEXT NOT NULL,
+        title      TEXT,
+        artist     TEXT,
+        album      TEXT,
+        isrc       TEXT,
+        PRIMARY KEY (spotify_id, playlist)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_unmatched_entries_playlist ON unmatched_entries (playlist);
+    """,
+    # v6: failure ledger with one row per track instead of one per failed search.
+    # The playlists a failed track belongs to are its unmatched entries.
+    """
+    CREATE TABLE IF NOT EXISTS failures (
+        spotify_id      TEXT PRIMARY KEY,
+        title           TEXT,
+        artist          TEXT,
+        album           TEXT,
+        reason          TEXT,
+        attempts        INTEGER NOT NULL DEFAULT 0,
+        first_failed_at TEXT,
+        last_failed_at  TEXT
+    ) WITHOUT ROWID;
+    INSERT OR IGNORE INTO failures
+        (spotify_id, title, artist, album, attempts, first_failed_at, last_failed_at)
+        SELECT COALESCE(spotify_id, title || ' - ' || artist), MAX(title), MAX(artist), MAX(album),
+               COUNT(*), MIN(failed_at), MAX(failed_at)
+        FROM failed_songs
+        WHERE COALESCE(spotify_id, title || ' - ' || artist) IS NOT NULL
+        GROUP BY COALESCE(spotify_id, title || ' - ' || artist);
+    INSERT OR IGNORE INTO unmatched_entries (spotify_id, playlist, title, artist, album)
+        SELECT spotify_id, playlist, title, artist, album FROM failed_songs
+        WHERE spotify_id IS NOT NULL AND playlist IS NOT NULL AND playlist != '';
+    DROP TABLE failed_songs;
+    """,
+]
+
+SONG_COLUMNS = "video_id, found, spotify_id, isrc, last_searched, attempts, miss_reason, expires_at"
+
+
+def _song_from_row(row: Optional[sqlite3.Row]) -> Optional[dict]:
+    if row is None:
+        return None
+    return {
+        "videoId": row["video_id"],
+        "found": bool(row["found"]),
+        "spotify_id": row["spotify_id"],
+        "isrc": row["isrc"],
+        "last_searched": row["last_searched"],
+        "attempts": row["attempts"],
+        "miss_reason": row["miss_reason"],
+        "expires_at": row["expires_at"],
+    }
+
+
+class MigrationStateStore:
+    """
+    Transactional on-disk store for the song cache, completed playlists
+    and the failure ledger.
+
+    Writes go into an open transaction and become durable on `commit()`.
+    The connection is shared between threads and guarded by a lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._apply_migrations()
+        except sqlite3.Error:
+            self._conn.close()
+            raise
+
+    def _apply_migrations(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, script in enumerate(SCHEMA_MIGRATIONS[version:], version + 1):
+                self._conn.executescript(script)
+                self._conn.execute(f"PRAGMA user_version = {target}")
+            self._conn.commit()
+
+    # ----- meta -----
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key: str, value: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value),
+            )
+
+    @property
+    def last_updated(self) -> Optional[str]:
+        return self.get_meta("last_updated")
+
+    # ----- song cache -----
+
+    def get_song(self, cache_key: str) -> Optional[dict]:
+        """Returns the cached search result for a title/artist key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {SONG_COLUMNS} FROM song_cache WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+        return _song_from_row(row)
+
+    def get_song_by_spotify_id(self, spotify_id: str) -> Optional[dict]:
+        """Returns the most recent search result for a Spotify track id, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {SONG_COLUMNS} FROM song_cache WHERE spotify_id = ? "
+                "ORDER BY last_searched DESC LIMIT 1",
+                (spotify_id,),
+            ).fetchone()
+        return _song_from_row(row)
+
+    def get_song_by_isrc(self, isrc: str) -> Optional[dict]:
+        """Returns a search result for a recording's ISRC, preferring matches."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {SONG_COLUMNS} FROM song_cache WHERE isrc = ? "
+                "ORDER BY found DESC, last_searched DESC LIMIT 1",
+                (isrc,),
+            ).fetchone()
+        return _song_from_row(row)
+
+    def put_song(self, cache_key: str, video_id: Optional[str], spotify_id: Optional[str],
+                 attempts: int = 1, last_searched: Optional[str] = None,
+                 isrc: Optional[str] = None, miss_reason: Optional[str] = None,
+                 expires_at: Optional[str] = None):
+        """
+        Upserts a single search result. Misses carry a reason
+        ("no_results" or "api_error") and the time they expire.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO song_cache "
+                "(cache_key, video_id, found, spotify_id, isrc, last_searched, attempts, miss_reason, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(cache_key) DO UPDATE SET "
+                "video_id = excluded.video_id, found = excluded.found, "
+                "spotify_id = excluded.spotify_id, isrc = COALESCE(excluded.isrc, isrc), "
+                "last_searched = excluded.last_searched, attempts = excluded.attempts, "
+                "miss_reason = excluded.miss_reason, expires_at = excluded.expires_at",
+                (cache_key, video_id, int(video_id is not None), spotify_id, isrc,
+                 last_searched or datetime.now().isoformat(), attempts,
+                 None if video_id else miss_reason, None if video_id else expires_at),
+            )
+
+    def count_songs(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM song_cache").fetchone()[0]
+
+    # ----- playlists -----
+
+    def mark_playlist_completed(self, playlist_id: str, name: str,
+                                snapshot_id: Optional[str] = None,
+                                yt_playlist_id: Optional[str] = None):
+        """Records a finished playlist with the Spotify snapshot it was synced from."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO completed_playlists "
+                "(playlist_id, name, completed_at, snapshot_id, yt_playlist_id) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(playlist_id) DO UPDATE SET "
+                "name = excluded.name, completed_at = excluded.completed_at, "
+                "snapshot_id = excluded.snapshot_id, yt_playlist_id = excluded.yt_playlist_id",
+                (playlist_id, name, datetime.now().isoformat(), snapshot_id, yt_playlist_id),
+            )
+
+    def get_completed_playlist(self, playlist_id: str) -> Optional[dict]:
+        """Returns {name, completed_at, snapshot_id, yt_playlist_id} or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, completed_at, snapshot_id, yt_playlist_id "
+                "FROM completed_playlists WHERE playlist_id = ?",
+                (playlist_id,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    # ----- YouTube Music library mirror -----
+
+    def update_yt_library(self, playlists: Iterable[Tuple[str, str, Optional[int]]]):
+        """Records (playlist_id, title, track count) as reported by the library listing."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO yt_playlists (playlist_id, title, library_count) VALUES (?, ?, ?) "
+                "ON CONFLICT(playlist_id) DO UPDATE SET "
+                "title = excluded.title, library_count = excluded.library_count",
+                playlists,
+            )
+
+    def get_mirrored_yt_playlist(self, playlist_id: str) -> Optional[Set[str]]:
+        """
+        Returns the mirrored videoIds of a YT Music playlist, or None if the
+        mirror is missing or its track count no longer matches the library.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT library_count, mirrored_count FROM yt_playlists WHERE playlist_id = ?",
+                (playlist_id,),
+            ).fetchone()
+            if row is None or row["mirrored_count"] is None or row["library_count"] is None:
+                return None
+            if row["library_count"] != row["mirrored_count"]:
+                return None
+            rows = self._conn.execute(
+                "SELECT video_id FROM yt_playlist_items WHERE playlist_id = ?",
+                (playlist_id,),
+            ).fetchall()
+        return {r["video_id"] for r in rows}
+
+    def replace_mirrored_yt_playlist(self, playlist_id: str, video_ids: Iterable[str],
+                                     track_count: int, title: Optional[str] = None):
+        """Replaces the mirror of a playlist with freshly downloaded contents."""
+        with self._lock:
+            self._conn.execute("DELETE FROM yt_playlist_items WHERE playlist_id = ?", (playlist_id,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO yt_playlist_items (playlist_id, video_id) VALUES (?, ?)",
+                ((playlist_id, vid) for vid in video_ids),
+            )
+            self._conn.execute(
+                "INSERT INTO yt_playlists (playlist_id, title, library_count, mirrored_count, refreshed_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(playlist_id) DO UPDATE SET "
+                "title = COALESCE(excluded.title, title), library_count = excluded.library_count, "
+                "mirrored_count = excluded.mirrored_count, refreshed_at = excluded.refreshed_at",
+                (playlist_id, title, track_count, track_count, datetime.now().isoformat()),
+            )
+
+    def add_mirrored_yt_items(self, playlist_id: str, video_ids: List[str]):
+        """Write-through for tracks this tool added to a playlist."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO yt_playlist_items (playlist_id, video_id) VALUES (?, ?)",
+                ((playlist_id, vid) for vid in video_ids),
+            )
+            self._conn.execute(
+                "UPDATE yt_playlists SET "
+                "library_count = library_count + ?, mirrored_count = mirrored_count + ? "
+                "WHERE playlist_id = ?",
+                (len(video_ids), len(video_ids), playlist_id),
+            )
+
+    # ----- unmatched playlist entries -----
+
+    def add_unmatched_entry(self, spotify_id: str, playlist: str, title: str, artist: str,
+                            album: str = "", isrc: Optional[str] = None):
+        """Records that `playlist` on YT Music is missing a track that had no match."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO unmatched_entries "
+                "(spotify_id, playlist, title, artist, album, isrc) VALUES (?, ?, ?, ?, ?, ?)",
+                (spotify_id, playlist, title, artist, album, isrc),
+            )
+
+    def clear_unmatched_entries(self, playlist: str):
+        """Forgets a playlist's unmatched entries before it is walked again in full."""
+        with self._lock:
+            self._conn.execute("DELETE FROM unmatched_entries WHERE playlist = ?", (playlist,))
+
+    def remove_unmatched_entries(self, spotify_id: str):
+        """Drops every pending entry of a track once it has been matched."""
+        with self._lock:
+            self._conn.execute("DELETE FROM unmatched_entries WHERE spotify_id = ?", (spotify_id,))
+
+    def iter_unmatched_entries(self) -> Iterator[dict]:
+        """Yields {spotify_id, playlist, title, artist, album, isrc} ordered by track."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT spotify_id, playlist, title, artist, album, isrc "
+                "FROM unmatched_entries ORDER BY spotify_id, playlist"
+            ).fetchall()
+        for row in rows:
+            yield dict(row)
+
+    def count_unmatched(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM unmatched_entries").fetchone()[0]
+
+    # ----- failure ledger -----
+
+    def record_failure(self, spotify_id: str, title: str, artist: str, album: str = "",
+                       reason: Optional[str] = None, failed_at: Optional[str] = None) -> int:
+        """Counts a failed search for a track. Returns its number of failed attempts."""
+        failed_at = failed_at or datetime.now().isoformat()
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO failures "
+                "(spotify_id, title, artist, album, reason, attempts, first_failed_at, last_failed_at) "
+                "VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT(spotify_id) DO UPDATE SET "
+                "title = excluded.title, artist = excluded.artist, album = excluded.album, "
+                "reason = excluded.reason, attempts = attempts + 1, "
+                "last_failed_at = excluded.last_failed_at "
+                "RETURNING attempts",
+                (spotify_id, title, artist, album, reason, failed_at, failed_at),
+            ).fetchone()[0]
+
+    def remove_failure(self, spotify_id: str):
+        """Drops a track from the ledger once it has been matched."""
+        with self._lock:
+            self._conn.execute("DELETE FROM failures WHERE spotify_id = ?", (spotify_id,))
+
+    def remove_failures(self, spotify_ids: Iterable[str]):
+        """Drops several tracks from the ledger, e.g. once they were added to a playlist."""
+        with self._lock:
+            self._conn.executemany("DELETE FROM failures WHERE spotify_id = ?", ((i,) for i in spotify_ids))
+
+    def iter_failures(self) -> Iterator[dict]:
+        """
+        Yields one dict per failed track, oldest failure first, with the
+        ledger columns plus `playlists`: the playlists still missing it.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT spotify_id, title, artist, album, reason, attempts, first_failed_at, last_failed_at "
+                "FROM failures ORDER BY first_failed_at, spotify_id"
+            ).fetchall()
+            playlists = {}
+            for spotify_id, playlist in self._conn.execute(
+                "SELECT spotify_id, playlist FROM unmatched_entries ORDER BY spotify_id, playlist"
+            ):
+                playlists.setdefault(spotify_id, []).append(playlist)
+        for row in rows:
+            failure = dict(row)
+            failure["playlists"] = playlists.get(row["spotify_id"], [])
+            yield failure
+
+    def count_failed(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM failures").fetchone()[0]
+
+    # ----- transactions -----
+
+    def commit(self):
+        """Makes all pending writes durable."""
+        with self._lock:
+            self.set_meta("version", STATE_VERSION)
+            self.set_meta("last_updated", datetime.now().isoformat())
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    # ----- legacy import -----
+
+    def import_json_state(self, json_path: str) -> bool:
+        """
+        One-time import of a legacy `.migration_state.json` file.
+        Returns True if anything was imported.
+        """
+        if self.get_meta("imported_json_state"):
+            return False
+        if not os.path.exists(json_path):
+            return False
+
+        with open(json_path, 'r') as f:
+            legacy = json.load(f)
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO song_cache "
+                "(cache_key, video_id, found, spotify_id, last_searched, attempts) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (key, entry.get("videoId"), int(bool(entry.get("found"))), entry.get("spotify_id"),
+                     entry.get("last_searched"), entry.get("attempts", 1))
+                    for key, entry in legacy.get("song_cache", {}).items()
+                ),
+            )
+            for song in legacy.get("failed_songs", []):
+                spotify_id = song.get("spotify_id") or f"{song['title']} - {song['artist']}"
+                self.record_failure(spotify_id, song["title"], song["artist"], song.get("album", ""),
+                                    failed_at=song.get("failed_at"))
+                if song.get("spotify_id") and song.get("playlist"):
+                    self.add_unmatched_entry(spotify_id, song["playlist"], song["title"], song["artist"],
+                                             song.get("album", ""))
+            for playlist_id in legacy.get("completed_playlists", []):
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO completed_playlists (playlist_id) VALUES (?)",
+                    (playlist_id,),
+                )
+            self.set_meta("imported_json_state", datetime.now().isoformat())
+            if legacy.get("last_updated"):
+                self.set_meta("last_updated", legacy["last_updated"])
+            self._conn.commit()
+        return True
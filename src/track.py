@@ -0,0 +1,50 @@
+"""
+Compact Spotify track record.
+
+Spotify track objects carry album art, available markets, popularity and
+more, while the migration only reads a track's id, title, artists, album
+name and ISRC. Tracks are reduced to a `Track` as each page is read, so
+the page payload can be freed right away and what the run keeps in
+memory no longer depends on how verbose the API response was.
+"""
+import sys
+from typing import Optional, Tuple
+
+
+class Track:
+    """
+    The parts of a Spotify track the migration uses. `__slots__` keeps
+    each instance to a few pointers; artist and album names repeat across
+    a library, so they are interned and stored once.
+    """
+
+    __slots__ = ("id", "name", "artists", "album", "isrc", "added_at")
+
+    def __init__(self, id: str, name: str, artists: Tuple[str, ...] = (), album: str = "",
+                 isrc: Optional[str] = None, added_at: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self.artists = artists
+        self.album = album
+        self.isrc = isrc
+        self.added_at = added_at
+
+    @classmethod
+    def from_spotify(cls, track: dict, added_at: Optional[str] = None) -> "Track":
+        """Extracts a Track from a Spotify track object and the `added_at` of its item."""
+        isrc = (track.get("external_ids") or {}).get("isrc")
+        return cls(
+            track["id"],
+            track.get("name") or "",
+            tuple(sys.intern(a["name"]) for a in track.get("artists") or () if a.get("name")),
+            sys.intern((track.get("album") or {}).get("name") or ""),
+            isrc.strip().upper() if isrc else None,
+            added_at,
+        )
+
+    @property
+    def artist_names(self) -> str:
+        return ", ".join(self.artists)
+
+    def __repr__(self) -> str:
+        return f"Track({self.id!r}, {self.name!r}, {self.artists!r}, {self.album!r})"
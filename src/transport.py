@@ -0,0 +1,81 @@
+"""
+Shared HTTP transport for the Spotify and YouTube Music clients.
+
+By default spotipy and ytmusicapi each build their own `requests.Session`
+with urllib3's default pool of 10 connections per host and no connect
+timeout (ytmusicapi) or a single 5 second timeout (spotipy). With many
+search and paging workers, connections beyond the pool size are opened
+and thrown away after each request, so every extra request pays for a
+new TCP and TLS handshake.
+
+`build_session()` returns one session for both clients. Each host gets a
+keep-alive pool sized to the number of concurrent workers, requests
+without an explicit timeout get separate connect and read timeouts, and
+responses may be compressed. Spotify API requests keep spotipy's own
+retry policy for 429/5xx responses. YouTube Music requests are never
+retried by the transport, because the migrator's adaptive rate limiters
+handle those errors.
+"""
+from typing import Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+SPOTIFY_API_PREFIX = "https://api.spotify.com/"
+SPOTIFY_ACCOUNTS_PREFIX = "https://accounts.spotify.com/"
+
+# Same policy spotipy.Spotify builds for its own session
+SPOTIFY_STATUS_FORCELIST = (429, 500, 502, 503, 504)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with a default (connect, read) timeout for requests that set none."""
+
+    def __init__(self, timeout: Tuple[float, float], **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def build_session(pool_size: int = 10, connect_timeout: float = 5.0, read_timeout: float = 30.0,
+                  compression: bool = True, spotify_retries: int = 3,
+                  spotify_backoff_factor: float = 0.3) -> requests.Session:
+    """
+    Returns a keep-alive session with `pool_size` connections per host.
+    With `compression` the session accepts every encoding urllib3 can
+    decode (gzip, deflate, plus br/zstd when brotli/zstandard are
+    installed); without it responses are requested uncompressed.
+    """
+    timeout = (connect_timeout, read_timeout)
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING if compression else "identity"
+    session.headers["Connection"] = "keep-alive"
+
+    def adapter(max_retries) -> TimeoutHTTPAdapter:
+        # pool_connections is the number of hosts kept, pool_maxsize the connections per host
+        return TimeoutHTTPAdapter(timeout, pool_connections=8, pool_maxsize=max(1, pool_size),
+                                  max_retries=max_retries)
+
+    # YouTube Music and everything else: retries are the caller's business
+    default = adapter(0)
+    session.mount("https://", default)
+    session.mount("http://", default)
+
+    spotify = adapter(Retry(
+        total=spotify_retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        status=spotify_retries,
+        backoff_factor=spotify_backoff_factor,
+        status_forcelist=SPOTIFY_STATUS_FORCELIST,
+    ))
+    session.mount(SPOTIFY_API_PREFIX, spotify)
+    session.mount(SPOTIFY_ACCOUNTS_PREFIX, spotify)
+    return session
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Title normalization benchmark: how many searches the canonical keys from
+src/normalize.py save over lowercased title/artist keys.
+
+Builds a sample library of recordings, each released under a few of the
+variants Spotify libraries are full of (remasters, radio edits, live
+tags, feat. clauses, diacritics, punctuation and artist order), every one
+with its own track id. A share of recordings also gets a different
+recording that is easy to confuse with it: the same title by the same
+artist (an "Intro" on another album), a "Pt. 2", a club edit or extended
+mix, or a title that differs only in punctuation ("Hello?"/"Hello!").
+Searches needed = unique cache keys. Also reports false merges
+(different recordings sharing a key), by kind of look-alike, and keys/sec.
+
+Usage:
+    python tests/benchmark_normalize.py
+    python tests/benchmark_normalize.py --recordings 50000 --variant-share 0.4 --lookalike-share 0.1 --json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from normalize import canonical_key  # noqa: E402
+
+WORDS = ("love", "night", "don't", "stop", "heart", "fire", "dream", "café", "señor", "blue", "city",
+         "rock'n'roll", "forever", "moon", "l'amour", "über", "summer", "rain", "gold", "angel")
+ARTISTS = tuple(f"{name} {i}" for i in range(400) for name in ("Beyoncé", "The Band", "MØ", "DJ"))[:1200]
+
+
+def _variants(title: str, artists: List[str], rng: random.Random) -> List[Tuple[str, List[str]]]:
+    guest = rng.choice([a for a in ARTISTS[:50] if a not in artists])
+    year = rng.randrange(1995, 2024)
+    return [
+        (f"{title} - Remastered {year}", artists),
+        (f"{title} - {year} Remaster", artists),
+        (f"{title} (Remastered)", artists),
+        (f"{title} - Radio Edit", artists),
+        (f"{title} - Single Version", artists),
+        (f"{title} - Live", artists),
+        (f"{title} [Live at Wembley]", artists),
+        (f"{title} (feat. {guest})", artists + [guest]),
+        (f"{title} ft. {guest}", artists + [guest]),
+        (title.upper(), artists),
+        (title.replace("'", "’"), artists),
+        (title.replace("e", "é", 1), artists),
+        (title, list(reversed(artists))),
+    ]
+
+
+# Distinct recordings that look like another one: kind -> (original title, look-alike title)
+LOOKALIKES = {
+    "same title and artist": lambda title: (title, title),
+    "part number": lambda title: (f"{title} Pt. 1", f"{title} Pt. 2"),
+    "club edit": lambda title: (title, f"{title} - Club Edit"),
+    "extended mix": lambda title: (title, f"{title} - Extended Mix"),
+    "punctuation": lambda title: (f"{title}?", f"{title}!"),
+}
+
+
+def make_sample(recordings: int, variant_share: float, lookalike_share: float,
+                seed: int) -> Tuple[List[Tuple[int, str, List[str]]], Dict[int, str]]:
+    """
+    (recording number, title, artists) per Spotify track, and the kind of
+    look-alike for recordings that were added as one.
+    """
+    rng = random.Random(seed)
+    tracks = []
+    kinds: Dict[int, str] = {}
+    n = 0
+    for _ in range(recordings):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(1, 4))).title() + f" {n}"
+        artists = rng.sample(ARTISTS, rng.choice((1, 1, 1, 2)))
+        lookalike = None
+        if rng.random() < lookalike_share:
+            kind = rng.choice(sorted(LOOKALIKES))
+            title, lookalike = LOOKALIKES[kind](title)
+        tracks.append((n, title, artists))
+        if rng.random() < variant_share:
+            options = _variants(title, artists, rng)
+            for title_variant, artists_variant in rng.sample(options, rng.randrange(1, 4)):
+                tracks.append((n, title_variant, artists_variant))
+        n += 1
+        if lookalike is not None:
+            kinds[n] = kind
+            tracks.append((n, lookalike, artists))
+            n += 1
+    return tracks, kinds
+
+
+def lowercase_key(title: str, artists: List[str]) -> str:
+    """The key used before normalize.py."""
+    return f"{title.strip().lower()}||{', '.join(artists).strip().lower()}"
+
+
+def measure(name: str, key: Callable[[str, List[str]], str], tracks, kinds: Dict[int, str]) -> dict:
+    start = time.perf_counter()
+    keys = [key(title, artists) for _, title, artists in tracks]
+    elapsed = time.perf_counter() - start
+    recordings_by_key: Dict[str, set] = {}
+    for (n, _, _), k in zip(tracks, keys):
+        recordings_by_key.setdefault(k, set()).add(n)
+    merged = {n for r in recordings_by_key.values() if len(r) > 1 for n in r}
+    by_kind = {kind: 0 for kind in sorted(LOOKALIKES)}
+    for n in merged:
+        if n in kinds:
+            by_kind[kinds[n]] += 1
+    return {
+        "key": name,
+        "tracks": len(tracks),
+        "searches": len(recordings_by_key),
+        "false_merges": sum(len(r) - 1 for r in recordings_by_key.values()),
+        "false_merges_by_kind": by_kind,
+        "keys_per_sec": round(len(tracks) / elapsed) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recordings", type=int, default=20000)
+    parser.add_argument("--variant-share", type=float, default=0.3,
+                        help="Share of recordings that also appear as 1-3 variants")
+    parser.add_argument("--lookalike-share", type=float, default=0.05,
+                        help="Share of recordings followed by a different recording that looks like them")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    args = parser.parse_args()
+
+    tracks, kinds = make_sample(args.recordings, args.variant_share, args.lookalike_share, args.seed)
+    results = [
+        measure("lowercase title||artists", lowercase_key, tracks, kinds),
+        measure("normalize.canonical_key", canonical_key, tracks, kinds),
+    ]
+    baseline = results[0]["searches"]
+    for r in results:
+        r["reduction"] = round(1 - r["searches"] / baseline, 4) if baseline else 0.0
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print("=" * 86)
+    print(f"{len(tracks)} tracks, {args.recordings + len(kinds)} recordings "
+          f"({args.variant_share:.0%} with variants, {len(kinds)} look-alikes)")
+    print("-" * 86)
+    print(f"{'Key':<28} {'Searches':>9} {'Reduction':>10} {'False merges':>13} {'Keys/s':>10}")
+    for r in results:
+        print(f"{r['key']:<28} {r['searches']:>9} {r['reduction']:>10.1%} {r['false_merges']:>13} "
+              f"{r['keys_per_sec']:>10}")
+    print("-" * 86)
+    print(f"{'Look-alikes merged':<28} " + " ".join(f"{r['key'].split('.')[-1][:20]:>20}" for r in results))
+    for kind in sorted(LOOKALIKES):
+        count = sum(1 for k in kinds.values() if k == kind)
+        print(f"{kind + f' ({count})':<28} "
+              + " ".join(f"{r['false_merges_by_kind'][kind]:>20}" for r in results))
+    print("=" * 86)
+
+
+if __name__ == "__main__":
+    main()
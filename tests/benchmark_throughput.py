@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the migration pipeline, run entirely offline
+against the fakes in tests/fakes.py.
+
+For each synthetic library size it runs a full migration in a fresh
+process and working directory and reports tracks/sec, API calls per track
+and peak RSS.
+
+Usage:
+    python tests/benchmark_throughput.py                      # 1k, 10k, 100k tracks
+    python tests/benchmark_throughput.py --sizes 1000 10000
+    python tests/benchmark_throughput.py --latency 0.02 --jitter 0.01 --rate 50
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from fakes import FakeSpotify, FakeYTMusic, install_fakes, load_migrator, make_library
+
+
+def run_once(args) -> dict:
+    """Runs one migration in this process and returns its measurements."""
+    migrator = load_migrator()
+    library = make_library(args.size, seed=args.seed)
+    entries = sum(len(t) for t in library["playlist_tracks"].values()) + len(library["liked"])
+
+    sp = FakeSpotify(library, latency=args.latency, jitter=args.jitter, seed=args.seed)
+    yt = FakeYTMusic(
+        latency=args.latency,
+        jitter=args.jitter,
+        seed=args.seed,
+        rate_limit=args.yt_rate_limit,
+        empty_body_rate=args.empty_body_rate,
+        miss_rate=args.miss_rate,
+    )
+    install_fakes(migrator, sp, yt, rate=args.rate)
+    migrator.SEARCH_WORKERS = args.workers
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrator.main()
+        elapsed = time.perf_counter() - start
+
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_rss_kb //= 1024  # bytes on macOS
+    yt_calls = yt.total_calls
+    sp_calls = sp.total_calls
+    return {
+        "size": args.size,
+        "entries": entries,
+        "seconds": round(elapsed, 3),
+        "tracks_per_sec": round(entries / elapsed, 1) if elapsed else None,
+        "yt_calls": yt_calls,
+        "spotify_calls": sp_calls,
+        "searches": yt.calls["search"],
+        "calls_per_track": round((yt_calls + sp_calls) / entries, 4) if entries else None,
+        "throttled": yt.throttled,
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--latency", type=float, default=0.0, help="Base latency per fake API call (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency per call (s)")
+    parser.add_argument("--rate", type=float, default=10000.0, help="Client-side request rate limit (req/s)")
+    parser.add_argument("--workers", type=int, default=4, help="Search workers")
+    parser.add_argument("--yt-rate-limit", type=float, default=None, help="Fake server 429 threshold (req/s)")
+    parser.add_argument("--empty-body-rate", type=float, default=0.0, help="Probability of an empty-body error")
+    parser.add_argument("--miss-rate", type=float, default=0.02, help="Share of searches with no result")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)  # child process mode
+    args = parser.parse_args()
+
+    if args.size is not None:
+        print(json.dumps(run_once(args)))
+        return
+
+    # Each size runs in its own process so peak RSS is measured per size
+    results = []
+    for size in args.sizes:
+        child = [sys.executable, os.path.abspath(__file__), "--size", str(size)]
+        for flag in ("latency", "jitter", "rate", "workers", "yt_rate_limit",
+                     "empty_body_rate", "miss_rate", "seed"):
+            value = getattr(args, flag)
+            if value is not None:
+                child += [f"--{flag.replace('_', '-')}", str(value)]
+        output = subprocess.run(child, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print("=" * 86)
+    print(f"{'Tracks':>8} {'Seconds':>9} {'Tracks/s':>10} {'Searches':>9} "
+          f"{'YT calls':>9} {'SP calls':>9} {'Calls/track':>12} {'Peak RSS':>10}")
+    print("-" * 86)
+    for r in results:
+        print(f"{r['entries']:>8} {r['seconds']:>9.2f} {r['tracks_per_sec']:>10.1f} {r['searches']:>9} "
+              f"{r['yt_calls']:>9} {r['spotify_calls']:>9} {r['calls_per_track']:>12.4f} "
+              f"{r['peak_rss_mb']:>8.1f}MB")
+    print("=" * 86)
+
+
+if __name__ == "__main__":
+    main()
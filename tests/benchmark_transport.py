@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+HTTP transport benchmark: the pooled session from src/transport.py against
+a new connection per request and a default requests.Session, with the
+same number of concurrent workers as a migration.
+
+A local keep-alive HTTP server stands in for the APIs. It counts the
+connections it accepts and can delay each new connection by
+`--handshake-ms` to stand in for the TCP + TLS setup a real HTTPS
+connection costs. No network access needed.
+
+Usage:
+    python tests/benchmark_transport.py
+    python tests/benchmark_transport.py --requests 4000 --workers 16 --handshake-ms 40
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from transport import build_session  # noqa: E402
+
+BODY = json.dumps({"contents": [{"videoId": f"vid{i:08d}", "title": "x" * 40} for i in range(20)]}).encode()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; avoid the delayed-ACK stall
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+        if self.server.handshake:
+            time.sleep(self.server.handshake)
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(latency: float, handshake: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.handshake = handshake
+    server.connections = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(name: str, get, server: ThreadingHTTPServer, url: str, total: int, workers: int) -> dict:
+    server.connections = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for response in pool.map(lambda _: get(url), range(total)):
+            response.raise_for_status()
+    elapsed = time.perf_counter() - start
+    return {
+        "transport": name,
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "requests_per_sec": round(total / elapsed, 1),
+        "ms_per_request": round(elapsed * 1000 * workers / total, 2),
+        "connections": server.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent workers (search + paging)")
+    parser.add_argument("--latency", type=float, default=0.002, help="Server time per request (s)")
+    parser.add_argument("--handshake-ms", type=float, default=20.0,
+                        help="Extra setup time per new connection (TLS stand-in)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines")
+    args = parser.parse_args()
+
+    server = start_server(args.latency, args.handshake_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_address[1]}/youtubei/v1/search"
+
+    def no_reuse(u):
+        return requests.get(u, headers={"Connection": "close"}, timeout=30)
+
+    default_session = requests.Session()
+    pooled = build_session(pool_size=args.workers)
+
+    results = [
+        run("new connection per request", no_reuse, server, url, args.requests, args.workers),
+        run("requests.Session (default pool)", default_session.get, server, url, args.requests, args.workers),
+        run("transport.build_session", pooled.get, server, url, args.requests, args.workers),
+    ]
+    server.shutdown()
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+
+    print("=" * 78)
+    print(f"{args.requests} requests, {args.workers} workers, {args.handshake_ms:.0f} ms per new connection")
+    print("-" * 78)
+    print(f"{'Transport':<34} {'Seconds':>8} {'Req/s':>9} {'ms/req':>8} {'Connections':>12}")
+    for r in results:
+        print(f"{r['transport']:<34} {r['seconds']:>8.2f} {r['requests_per_sec']:>9.1f} "
+              f"{r['ms_per_request']:>8.2f} {r['connections']:>12}")
+    print("=" * 78)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Offline stand-ins for the spotipy.Spotify and YTMusic surfaces used by the
+migration script, for tests and benchmarks that must not touch live services.
+
+Both fakes support configurable latency and jitter. FakeYTMusic can also
+inject the failures seen in practice: HTTP 429 responses above a request
+rate, the empty-body JSONDecodeError YouTube Music returns when throttling,
+videoIds that make an add request fail, and create requests that time
+out after the playlist was created.
+"""
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import requests
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def load_migrator():
+    """Imports src/spotify_to_ytmusic.py as a module."""
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    import spotify_to_ytmusic
+    return spotify_to_ytmusic
+
+
+LIKED_NEWEST = datetime(2025, 6, 1)
+
+
+def _stable_hash(text: str) -> int:
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+class _FakeService:
+    """Latency, jitter and call counting shared by both fakes."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, name: str):
+        with self._lock:
+            self.calls[name] += 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+# ----- SYNTHETIC LIBRARY -----
+
+def make_track(index: int) -> dict:
+    """A Spotify track object with the usual (verbose) payload."""
+    return {
+        "id": f"sp{index:07d}",
+        "name": f"Song {index}",
+        "artists": [{"id": f"ar{index % 997}", "name": f"Artist {index % 997}", "type": "artist"}],
+        "album": {
+            "id": f"al{index % 4001}",
+            "name": f"Album {index % 4001}",
+            "images": [{"url": f"https://i.scdn.co/image/{index}", "height": 640, "width": 640}],
+            "available_markets": ["US", "GB", "DE", "FR", "IN", "JP", "BR"],
+        },
+        "external_ids": {"isrc": f"USFAKE{index:07d}"},
+        "duration_ms": 180000 + index % 60000,
+        "available_markets": ["US", "GB", "DE", "FR", "IN", "JP", "BR"],
+        "popularity": index % 100,
+        "type": "track",
+    }
+
+
+def make_library(total_tracks: int, playlist_size: int = 200, liked_share: float = 0.3,
+                 overlap: float = 0.25, seed: int = 0) -> dict:
+    """
+    Builds a synthetic Spotify library with about `total_tracks` playlist
+    and liked entries. A fraction `overlap` of each playlist is drawn from
+    a shared pool of popular songs, so tracks repeat across playlists the
+    way they do in real libraries.
+    """
+    rng = random.Random(seed)
+    liked_count = int(total_tracks * liked_share)
+    playlist_entries = total_tracks - liked_count
+    unique_pool = max(1, int(total_tracks * (1 - overlap)))
+    popular_pool = max(1, unique_pool // 20)
+
+    next_index = 0
+    playlists: List[dict] = []
+    playlist_tracks: Dict[str, List[dict]] = {}
+    while sum(len(t) for t in playlist_tracks.values()) < playlist_entries:
+        pid = f"pl{len(playlists):05d}"
+        size = min(playlist_size, playlist_entries - sum(len(t) for t in playlist_tracks.values()))
+        tracks = []
+        for _ in range(size):
+            if rng.random() < overlap:
+                tracks.append(make_track(rng.randrange(popular_pool)))
+            else:
+                tracks.append(make_track(popular_pool + next_index % unique_pool))
+                next_index += 1
+        playlists.append({
+            "id": pid,
+            "name": f"Playlist {len(playlists)}",
+            "description": "Synthetic playlist",
+            "snapshot_id": f"{pid}-snap1",
+            "tracks": {"total": len(tracks)},
+        })
+        playlist_tracks[pid] = tracks
+
+    liked = []
+    for i in range(liked_count):
+        index = rng.randrange(popular_pool) if rng.random() < overlap else popular_pool + next_index % unique_pool
+        next_index += 1
+        # Newest first, one like per minute
+        added_at = LIKED_NEWEST - timedelta(minutes=i)
+        liked.append({"added_at": added_at.strftime("%Y-%m-%dT%H:%M:%SZ"), "track": make_track(index)})
+
+    return {"playlists": playlists, "playlist_tracks": playlist_tracks, "liked": liked}
+
+
+# ----- SPOTIFY -----
+
+class FakeSpotify(_FakeService):
+    """Paginated playlists, playlist items and saved tracks."""
+
+    def __init__(self, library: dict, **kwargs):
+        super().__init__(**kwargs)
+        self.library = library
+
+    def _page(self, href: str, items: list, limit: int, offset: int) -> dict:
+        end = offset + limit
+        total = len(items)
+        # Freshly decoded objects on every call, like a real HTTP response
+        items = json.loads(json.dumps(items[offset:end]))
+        return {
+            "href": f"{href}?offset={offset}&limit={limit}",
+            "items": items,
+            "limit": limit,
+            "offset": offset,
+            "total": total,
+            "next": f"{href}?offset={end}&limit={limit}" if end < total else None,
+            "previous": None,
+        }
+
+    def current_user_playlists(self, limit: int = 50, offset: int = 0) -> dict:
+        self._call("current_user_playlists")
+        return self._page("me/playlists", self.library["playlists"], limit, offset)
+
+    def playlist_items(self, playlist_id: str, fields: Optional[str] = None, limit: int = 100,
+                       offset: int = 0, market: Optional[str] = None,
+                       additional_types=("track", "episode")) -> dict:
+        self._call("playlist_items")
+        items = [{"added_at": None, "track": t} for t in self.library["playlist_tracks"][playlist_id]]
+        return self._page(f"playlists/{playlist_id}/tracks", items, limit, offset)
+
+    def current_user_saved_tracks(self, limit: int = 20, offset: int = 0, market: Optional[str] = None) -> dict:
+        self._call("current_user_saved_tracks")
+        return self._page("me/tracks", self.library["liked"], limit, offset)
+
+    def next(self, result: dict) -> Optional[dict]:
+        if not result.get("next"):
+            return None
+        href, query = result["next"].split("?")
+        params = dict(p.split("=") for p in query.split("&"))
+        limit, offset = int(params["limit"]), int(params["offset"])
+        if href == "me/playlists":
+            return self.current_user_playlists(limit, offset)
+        if href == "me/tracks":
+            return self.current_user_saved_tracks(limit, offset)
+        return self.playlist_items(href.split("/")[1], limit=limit, offset=offset)
+
+
+# ----- YOUTUBE MUSIC -----
+
+class FakeYTMusic(_FakeService):
+    """
+    search, library playlists and playlist editing.
+
+    Failure injection:
+      rate_limit       - requests/sec above which calls fail with HTTP 429
+      empty_body_rate  - probability of an empty-body JSONDecodeError
+      miss_rate        - share of queries with no search results (stable per query)
+      bad_video_ids    - videoIds that make any add request containing them fail
+      bad_video_status - adds containing a bad videoId return a STATUS_FAILED
+                         response instead of raising, as ytmusicapi does when
+                         the service does not apply an edit
+      create_timeouts  - number of create requests that create the playlist
+                         but then fail on the client with a read timeout
+    """
+
+    def __init__(self, rate_limit: Optional[float] = None, empty_body_rate: float = 0.0,
+                 miss_rate: float = 0.0, bad_video_ids=(), bad_video_status: bool = False,
+                 create_timeouts: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.rate_limit = rate_limit
+        self.empty_body_rate = empty_body_rate
+        self.miss_rate = miss_rate
+        self.bad_video_ids = set(bad_video_ids)
+        self.bad_video_status = bad_video_status
+        self.create_timeouts = create_timeouts
+        self.playlists: Dict[str, dict] = {}
+        self.throttled = 0
+        self._recent: deque = deque()
+
+    def _call(self, name: str):
+        super()._call(name)
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                while self._recent and now - self._recent[0] > 1.0:
+                    self._recent.popleft()
+                self._recent.append(now)
+                if len(self._recent) > self.rate_limit:
+                    self.throttled += 1
+                    raise Exception("Server returned HTTP 429: Too Many Requests.")
+            if self.empty_body_rate and self._random.random() < self.empty_body_rate:
+                self.throttled += 1
+                raise json.JSONDecodeError("Expecting value", "", 0)
+
+    @staticmethod
+    def video_id_for(query: str) -> str:
+        return f"yt{_stable_hash(query):08x}"[:11]
+
+    def search(self, query: str, filter: Optional[str] = None, scope: Optional[str] = None,
+               limit: int = 20, ignore_spelling: bool = False) -> list:
+        self._call("search")
+        if self.miss_rate and _stable_hash("miss:" + query) % 10000 < self.miss_rate * 10000:
+            return []
+        return [{"videoId": self.video_id_for(query), "title": query, "resultType": "song"}]
+
+    def get_library_playlists(self, limit: Optional[int] = 25) -> list:
+        self._call("get_library_playlists")
+        return [
+            # ytmusicapi passes on the display string, e.g. "1,234"
+            {"playlistId": pid, "title": pl["title"], "count": f"{len(pl['tracks']):,}"}
+            for pid, pl in self.playlists.items()
+        ]
+
+    def get_playlist(self, playlistId: str, limit: Optional[int] = 100, related: bool = False,
+                     suggestions_limit: int = 0) -> dict:
+        self._call("get_playlist")
+        pl = self.playlists[playlistId]
+        tracks = pl["tracks"] if limit is None else pl["tracks"][:limit]
+        return {
+            "id": playlistId,
+            "title": pl["title"],
+            "trackCount": len(pl["tracks"]),
+            "tracks": [{"videoId": vid, "setVideoId": f"set-{vid}"} for vid in tracks],
+        }
+
+    def create_playlist(self, title: str, description: str, privacy_status: str = "PRIVATE",
+                        video_ids: Optional[List[str]] = None, source_playlist: Optional[str] = None):
+        self._call("create_playlist")
+        video_ids = list(video_ids or [])
+        bad = self.bad_video_ids.intersection(video_ids)
+        if bad:
+            raise Exception("Server returned HTTP 400: Bad Request. Request contains an invalid argument.")
+        with self._lock:
+            playlist_id = f"PLFAKE{len(self.playlists):06d}"
+            self.playlists[playlist_id] = {"title": title, "description": description, "tracks": video_ids}
+            if self.create_timeouts:
+                self.create_timeouts -= 1
+                raise requests.exceptions.ReadTimeout("Read timed out. (read timeout=30.0)")
+        return playlist_id
+
+    def add_playlist_items(self, playlistId: str, videoIds: Optional[List[str]] = None,
+                           source_playlist: Optional[str] = None, duplicates: bool = False):
+        self._call("add_playlist_items")
+        videoIds = list(videoIds or [])
+        if self.bad_video_ids.intersection(videoIds):
+            if self.bad_video_status:
+                return {"status": "STATUS_FAILED", "actions": []}
+            raise Exception("Server returned HTTP 400: Bad Request. Request contains an invalid argument.")
+        with self._lock:
+            self.playlists[playlistId]["tracks"].extend(videoIds)
+        return {
+            "status": "STATUS_SUCCEEDED",
+            "playlistEditResults": [{"videoId": vid, "setVideoId": f"set-{vid}"} for vid in videoIds],
+        }
+
+
+def install_fakes(migrator, sp: FakeSpotify, yt: FakeYTMusic, rate: float = 10000.0, burst: int = 50,
+                  min_rate: float = 0.2):
+    """
+    Points the migrator's client factories at the fakes and replaces its
+    rate limiters with ones allowing `rate` requests/sec, backing off to no
+    less than `min_rate` when throttled.
+    """
+    migrator.get_spotify_client = lambda *args, **kwargs: sp
+    migrator.get_ytmusic_client = lambda *args, **kwargs: yt
+    for name in ("search_limiter", "write_limiter", "read_limiter"):
+        setattr(migrator, name, migrator.AdaptiveRateLimiter(rate, burst, min_rate=min_rate, max_rate=rate))
@@ -0,0 +1,593 @@
+#!/usr/bin/env python3
+"""
+Offline migration tests using the fake Spotify and YouTube Music backends.
+No credentials or network access needed.
+"""
+import contextlib
+import functools
+import io
+import json
+import os
+import signal
+import tempfile
+
+from fakes import FakeSpotify, FakeYTMusic, install_fakes, load_migrator, make_library, make_track
+
+migrator = load_migrator()
+
+
+def in_temp_dir(test):
+    """
+    Runs a test in a fresh working directory, so each starts without state
+    or output files. A test that returns False raises AssertionError, so
+    pytest reports it as failed.
+    """
+    @functools.wraps(test)
+    def wrapper():
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            try:
+                passed = test()
+            finally:
+                os.chdir(cwd)
+        if not passed:
+            raise AssertionError(f"{test.__name__} failed, see the output above")
+    return wrapper
+
+
+def run_migration(sp, yt, retry_failed=False, **limits):
+    """Runs main() quietly; returns the console output."""
+    install_fakes(migrator, sp, yt, **limits)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        migrator.main(retry_failed=retry_failed)
+    return output.getvalue()
+
+
+def expected_video_ids(yt, tracks):
+    """videoIds the fake search returns for tracks, in order, without misses or repeats."""
+    seen = set()
+    expected = []
+    for t in tracks:
+        query = migrator.spotify_track_search_query(migrator.Track.from_spotify(t))
+        if not yt.search(query):
+            continue
+        vid = yt.video_id_for(query)
+        if vid not in seen:
+            seen.add(vid)
+            expected.append(vid)
+    return expected
+
+
+@in_temp_dir
+def test_full_migration():
+    """Test 1: Every playlist and liked songs end up on YT Music, in order"""
+    print("Test 1: Full Migration")
+    print("-" * 50)
+    library = make_library(600, playlist_size=100)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic(miss_rate=0.05)
+    run_migration(sp, yt)
+    searches = yt.calls["search"]
+    adds = yt.calls["add_playlist_items"]
+
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    for pl in library["playlists"]:
+        expected = expected_video_ids(yt, library["playlist_tracks"][pl["id"]])
+        if by_title.get(pl["name"]) != expected:
+            print(f"✗ FAILED: playlist '{pl['name']}' does not match")
+            return False
+    liked = expected_video_ids(yt, [item["track"] for item in library["liked"]])
+    if by_title.get(migrator.LIKED_SONGS_PLAYLIST_NAME) != liked:
+        print("✗ FAILED: liked songs do not match")
+        return False
+
+    # The first batch of every new playlist goes out with create_playlist
+    batch = migrator.ADD_BATCH_SIZE
+    overflow = sum(-(-len(tracks) // batch) - 1 for tracks in by_title.values())
+    if adds != overflow:
+        print(f"✗ FAILED: {adds} add requests, expected {overflow} for overflow batches only")
+        return False
+
+    unique = len({t["id"] for tracks in library["playlist_tracks"].values() for t in tracks}
+                 | {item["track"]["id"] for item in library["liked"]})
+    if searches > unique:
+        print(f"✗ FAILED: {searches} searches for {unique} unique tracks")
+        return False
+    # Cold cache: each unique track is looked up once and missed once
+    with open(migrator.RUN_REPORT_FILE) as f:
+        cache = json.load(f)["cache"]
+    if cache["lookups"] != unique or cache["misses"] != searches:
+        print(f"✗ FAILED: cache stats {cache} for {unique} unique tracks and {searches} searches")
+        return False
+    print(f"✓ SUCCESS: {len(by_title)} playlists, {searches} searches for {unique} unique tracks")
+    return True
+
+
+@in_temp_dir
+def test_rerun_is_incremental():
+    """Test 2: A second run with nothing changed makes no searches or adds"""
+    print("\nTest 2: Incremental Re-run")
+    print("-" * 50)
+    library = make_library(400, playlist_size=100)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic()
+    run_migration(sp, yt)
+    yt.calls.clear()
+    sp.calls.clear()
+    run_migration(sp, yt)
+
+    if yt.calls["search"] or yt.calls["add_playlist_items"] or yt.calls["get_playlist"]:
+        print(f"✗ FAILED: unexpected calls on re-run: {dict(yt.calls)}")
+        return False
+    if sp.calls["playlist_items"]:
+        print(f"✗ FAILED: unchanged playlists were fetched again: {dict(sp.calls)}")
+        return False
+    print(f"✓ SUCCESS: re-run made {yt.total_calls} YT and {sp.total_calls} Spotify calls")
+    return True
+
+
+@in_temp_dir
+def test_throttling_recovers():
+    """Test 3: Empty-body rate limit errors slow the limiter down but lose nothing"""
+    print("\nTest 3: Throttling Recovery")
+    print("-" * 50)
+    library = make_library(300, playlist_size=100)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic(empty_body_rate=0.05, seed=1)
+    run_migration(sp, yt, min_rate=50.0)
+
+    if not yt.throttled:
+        print("✗ FAILED: no throttling was injected")
+        return False
+    if migrator.search_limiter.rate >= 10000.0:
+        print("✗ FAILED: search rate was not reduced")
+        return False
+    total = sum(len(pl["tracks"]) for pl in yt.playlists.values())
+    if total == 0:
+        print("✗ FAILED: nothing was migrated")
+        return False
+    print(f"✓ SUCCESS: {yt.throttled} throttled calls, {total} tracks migrated")
+    return True
+
+
+@in_temp_dir
+def test_retry_failed():
+    """Test 4: --retry-failed adds songs that became available, without Spotify"""
+    print("\nTest 4: Retry Failed Songs")
+    print("-" * 50)
+    library = make_library(300, playlist_size=100)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic(miss_rate=0.2)
+    # Misses expire at once, as if the retry ran after NO_RESULTS_TTL_DAYS
+    ttl_days = migrator.NO_RESULTS_TTL_DAYS
+    migrator.NO_RESULTS_TTL_DAYS = 0
+    try:
+        run_migration(sp, yt)
+        # The songs get uploaded in the meantime
+        yt.miss_rate = 0.0
+        sp.calls.clear()
+        yt.calls.clear()
+        run_migration(sp, yt, retry_failed=True)
+    finally:
+        migrator.NO_RESULTS_TTL_DAYS = ttl_days
+    searches = yt.calls["search"]
+
+    if sp.total_calls:
+        print(f"✗ FAILED: retry called Spotify: {dict(sp.calls)}")
+        return False
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    for pl in library["playlists"]:
+        expected = expected_video_ids(yt, library["playlist_tracks"][pl["id"]])
+        if sorted(by_title.get(pl["name"], [])) != sorted(expected):
+            print(f"✗ FAILED: playlist '{pl['name']}' is still missing songs")
+            return False
+    state = migrator.load_migration_state()
+    unmatched = state.count_unmatched()
+    state.close()
+    if unmatched:
+        print(f"✗ FAILED: {unmatched} entries still unmatched")
+        return False
+    print(f"✓ SUCCESS: {searches} songs searched again, no Spotify calls")
+    return True
+
+
+@in_temp_dir
+def test_interrupt_and_resume():
+    """Test 5: Ctrl+C mid-playlist saves progress; the next run finishes without repeating searches"""
+    print("\nTest 5: Interrupt and Resume")
+    print("-" * 50)
+    library = make_library(500, playlist_size=100)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic(miss_rate=0.05)
+    search = yt.search
+
+    def interrupting_search(*args, **kwargs):
+        if yt.calls["search"] == 250:
+            os.kill(os.getpid(), signal.SIGINT)
+        return search(*args, **kwargs)
+
+    # Stream playlist by playlist so the interrupt lands inside one
+    saved = migrator.GLOBAL_DEDUP, migrator.CHECKPOINT_EVERY_TRACKS
+    migrator.GLOBAL_DEDUP, migrator.CHECKPOINT_EVERY_TRACKS = False, 50
+    try:
+        yt.search = interrupting_search
+        try:
+            run_migration(sp, yt)
+            print("✗ FAILED: the run was not interrupted")
+            return False
+        except SystemExit as e:
+            if e.code != 130:
+                print(f"✗ FAILED: interrupted run exited with {e.code}")
+                return False
+        first = yt.calls["search"]
+        state = migrator.load_migration_state()
+        cached = state.count_songs()
+        state.close()
+        yt.search = search
+        run_migration(sp, yt)
+    finally:
+        migrator.GLOBAL_DEDUP, migrator.CHECKPOINT_EVERY_TRACKS = saved
+    searches = yt.calls["search"]
+
+    if cached < first:
+        print(f"✗ FAILED: only {cached} of {first} searches were saved")
+        return False
+    unique = len({t["id"] for tracks in library["playlist_tracks"].values() for t in tracks}
+                 | {item["track"]["id"] for item in library["liked"]})
+    if searches > unique:
+        print(f"✗ FAILED: {searches} searches for {unique} unique tracks across both runs")
+        return False
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    for pl in library["playlists"]:
+        expected = expected_video_ids(yt, library["playlist_tracks"][pl["id"]])
+        if by_title.get(pl["name"]) != expected:
+            print(f"✗ FAILED: playlist '{pl['name']}' does not match after resuming")
+            return False
+    print(f"✓ SUCCESS: interrupted after {first} searches, {searches} in total for {unique} unique tracks")
+    return True
+
+
+def check_rejected_adds(yt):
+    """
+    Migrates a library in which two videos of the first playlist cannot be
+    added, then retries them once they can. Returns an error message or None.
+    """
+    library = make_library(300, playlist_size=100)
+    first = library["playlists"][0]
+    bad = expected_video_ids(yt, library["playlist_tracks"][first["id"]])[3:40:36]
+    yt.bad_video_ids.update(bad)
+    yt.calls.clear()
+    sp = FakeSpotify(library)
+    run_migration(sp, yt)
+
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    for pl in library["playlists"]:
+        expected = [vid for vid in expected_video_ids(yt, library["playlist_tracks"][pl["id"]])
+                    if vid not in bad]
+        if by_title.get(pl["name"]) != expected:
+            return f"playlist '{pl['name']}' lost tracks next to a rejected one"
+    state = migrator.load_migration_state()
+    unmatched = {e["playlist"] for e in state.iter_unmatched_entries()}
+    failures = [f["reason"] for f in state.iter_failures()]
+    first_id = next(pid for pid, pl in yt.playlists.items() if pl["title"] == first["name"])
+    mirrored = {row[0] for row in state._conn.execute(
+        "SELECT video_id FROM yt_playlist_items WHERE playlist_id = ?", (first_id,))}
+    state.close()
+    if unmatched != {first["name"]}:
+        return f"rejected tracks recorded for {unmatched or 'no playlists'}"
+    if failures != ["add_rejected"] * len(bad):
+        return f"failure ledger has {failures} instead of {len(bad)} rejected adds"
+    if mirrored.intersection(bad):
+        return "rejected videos recorded in the library mirror"
+    with open(migrator.FAILED_SONGS_FILE) as f:
+        if f"Total failed songs: {len(bad)}" not in f.read():
+            return f"{migrator.FAILED_SONGS_FILE} does not list the rejected tracks"
+
+    # Once the videos are available again, --retry-failed adds them
+    yt.bad_video_ids.clear()
+    run_migration(sp, yt, retry_failed=True)
+    expected = expected_video_ids(yt, library["playlist_tracks"][first["id"]])
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    if sorted(by_title[first["name"]]) != sorted(expected):
+        return "--retry-failed did not add the rejected tracks"
+    state = migrator.load_migration_state()
+    failed = state.count_failed()
+    state.close()
+    if failed:
+        return f"{failed} tracks still in the failure ledger after they were added"
+    return None
+
+
+@in_temp_dir
+def test_rejected_adds_are_isolated():
+    """Test 6: An unavailable video is isolated by bisection without dropping its batch"""
+    print("\nTest 6: Rejected Adds")
+    print("-" * 50)
+    yt = FakeYTMusic()
+    error = check_rejected_adds(yt)
+    if error:
+        print(f"✗ FAILED: {error}")
+        return False
+    print(f"✓ SUCCESS: rejected videos isolated in {yt.calls['add_playlist_items']} add requests, "
+          f"added later by --retry-failed")
+    return True
+
+
+@in_temp_dir
+def test_failed_status_is_a_rejection():
+    """Test 10: An add answered with a failed status (not an exception) is bisected like an error"""
+    print("\nTest 10: Rejected Adds (Failed Status)")
+    print("-" * 50)
+    yt = FakeYTMusic(bad_video_status=True)
+    error = check_rejected_adds(yt)
+    if error:
+        print(f"✗ FAILED: {error}")
+        return False
+    print(f"✓ SUCCESS: STATUS_FAILED responses isolated in {yt.calls['add_playlist_items']} add requests")
+    return True
+
+
+@in_temp_dir
+def test_budget_queues_the_rest():
+    """Test 7: A call budget stops the run after the top-priority playlists; the next run finishes the queue"""
+    print("\nTest 7: Run Budget")
+    print("-" * 50)
+    library = make_library(600, playlist_size=100)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic(miss_rate=0.05)
+    saved = migrator.RUN_CALL_BUDGET, migrator.RUN_PRIORITY
+    migrator.RUN_CALL_BUDGET, migrator.RUN_PRIORITY = 300, ["liked_first", "smallest_first"]
+    try:
+        run_migration(sp, yt)
+        calls = yt.total_calls
+        first = [pl["title"] for pl in yt.playlists.values()]
+        state = migrator.load_migration_state()
+        queued = json.loads(state.get_meta("queued_work") or "[]")
+        state.close()
+        migrator.RUN_CALL_BUDGET = None
+        run_migration(sp, yt)
+    finally:
+        migrator.RUN_CALL_BUDGET, migrator.RUN_PRIORITY = saved
+
+    if calls > 300:
+        print(f"✗ FAILED: {calls} YT Music calls for a budget of 300")
+        return False
+    if not first or first[0] != migrator.LIKED_SONGS_PLAYLIST_NAME:
+        print(f"✗ FAILED: Liked Songs did not go first: {first}")
+        return False
+    if not queued:
+        print("✗ FAILED: nothing was queued for the next run")
+        return False
+    names = {pl["id"]: pl["name"] for pl in library["playlists"]}
+    created = [pl["title"] for pl in yt.playlists.values()][len(first):]
+    if sorted(created) != sorted(names[key] for key in queued):
+        print(f"✗ FAILED: second run created {created}, expected the queued playlists")
+        return False
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    for pl in library["playlists"]:
+        expected = expected_video_ids(yt, library["playlist_tracks"][pl["id"]])
+        if by_title.get(pl["name"]) != expected:
+            print(f"✗ FAILED: playlist '{pl['name']}' does not match after the second run")
+            return False
+    print(f"✓ SUCCESS: {len(first)} playlists in {calls} calls, {len(queued)} queued and finished next run")
+    return True
+
+
+@in_temp_dir
+def test_title_variants_share_a_search():
+    """Test 8: Remaster, edit, live and feat. variants of one recording are searched once"""
+    print("\nTest 8: Title Variants")
+    print("-" * 50)
+    library = make_library(200, playlist_size=100)
+    first, second = (library["playlist_tracks"][pl["id"]] for pl in library["playlists"][:2])
+    base = first[0]
+    variants = [
+        (base["name"] + " - Remastered 2011", base["artists"]),
+        (base["name"] + " (feat. Guest)", base["artists"] + [{"name": "Guest"}]),
+        (base["name"] + " - Radio Edit", base["artists"]),
+        (base["name"].replace("o", "ó", 1) + " [Live]", list(reversed(base["artists"]))),
+    ]
+    for i, (name, artists) in enumerate(variants):
+        second.append(dict(base, id=f"spvar{i:03d}", name=name, artists=artists,
+                           external_ids={"isrc": f"USVAR{i:07d}"}))
+    library["playlists"][1]["tracks"]["total"] = len(second)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic()
+    run_migration(sp, yt)
+    searches = yt.calls["search"]
+
+    unique = len({t["id"] for tracks in library["playlist_tracks"].values() for t in tracks}
+                 | {item["track"]["id"] for item in library["liked"]})
+    if searches != unique - len(variants):
+        print(f"✗ FAILED: {searches} searches for {unique} tracks, {len(variants)} of them variants")
+        return False
+    base_vid = yt.video_id_for(migrator.spotify_track_search_query(migrator.Track.from_spotify(base)))
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    if base_vid not in by_title.get(library["playlists"][1]["name"], []):
+        print("✗ FAILED: variants were not matched to the original recording")
+        return False
+    print(f"✓ SUCCESS: {len(variants)} variants resolved from the cache, {searches} searches")
+    return True
+
+
+@in_temp_dir
+def test_concurrent_lookups_share_a_search():
+    """Test 9: Workers resolving the same song at the same time make one search"""
+    print("\nTest 9: Concurrent Duplicates")
+    print("-" * 50)
+    library = make_library(400, playlist_size=100)
+    for pl in library["playlists"]:
+        # Every song three times in a row, so repeats are in flight together
+        tracks = library["playlist_tracks"][pl["id"]]
+        tracks[:] = [t for t in tracks for _ in range(3)]
+        pl["tracks"]["total"] = len(tracks)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic(latency=0.005)
+    saved = migrator.GLOBAL_DEDUP
+    migrator.GLOBAL_DEDUP = False  # No planning pass to dedup the tracks up front
+    try:
+        run_migration(sp, yt)
+    finally:
+        migrator.GLOBAL_DEDUP = saved
+    searches = yt.calls["search"]
+
+    unique = len({t["id"] for tracks in library["playlist_tracks"].values() for t in tracks}
+                 | {item["track"]["id"] for item in library["liked"]})
+    if searches != unique:
+        print(f"✗ FAILED: {searches} searches for {unique} unique tracks")
+        return False
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    for pl in library["playlists"]:
+        expected = expected_video_ids(yt, library["playlist_tracks"][pl["id"]])
+        if by_title.get(pl["name"]) != expected:
+            print(f"✗ FAILED: playlist '{pl['name']}' does not match")
+            return False
+    print(f"✓ SUCCESS: {searches} searches for {unique} unique tracks, no duplicates in flight")
+    return True
+
+
+@in_temp_dir
+def test_create_timeout_does_not_duplicate():
+    """Test 11: A create request that times out after creating the playlist is not repeated"""
+    print("\nTest 11: Create Timeout")
+    print("-" * 50)
+    library = make_library(300, playlist_size=100)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic(create_timeouts=2)
+    run_migration(sp, yt)
+
+    titles = [pl["title"] for pl in yt.playlists.values()]
+    if len(titles) != len(set(titles)):
+        print(f"✗ FAILED: duplicate playlists {sorted(t for t in titles if titles.count(t) > 1)}")
+        return False
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    for pl in library["playlists"]:
+        if by_title.get(pl["name"]) != expected_video_ids(yt, library["playlist_tracks"][pl["id"]]):
+            print(f"✗ FAILED: playlist '{pl['name']}' does not match")
+            return False
+    print(f"✓ SUCCESS: {len(titles)} playlists after 2 create timeouts, no duplicates")
+    return True
+
+
+@in_temp_dir
+def test_corrupt_state_starts_fresh():
+    """Test 12: An unreadable state database is moved aside instead of stopping the run"""
+    print("\nTest 12: Corrupt State")
+    print("-" * 50)
+    with open(migrator.STATE_FILE, "wb") as f:
+        f.write(b"not a database" * 100)
+    library = make_library(100, playlist_size=50)
+    yt = FakeYTMusic()
+    run_migration(FakeSpotify(library), yt)
+
+    backups = [name for name in os.listdir(".") if name.startswith(migrator.STATE_FILE + ".corrupt-")]
+    if len(backups) != 1:
+        print(f"✗ FAILED: expected the unreadable state file to be moved aside, found {backups}")
+        return False
+    if len(yt.playlists) != len(library["playlists"]) + 1:
+        print(f"✗ FAILED: {len(yt.playlists)} playlists migrated after starting fresh")
+        return False
+    print(f"✓ SUCCESS: moved to {backups[0]}, {len(yt.playlists)} playlists migrated")
+    return True
+
+
+@in_temp_dir
+def test_expired_misses_rerun_unchanged_playlists():
+    """Test 13: A normal re-run searches expired misses of unchanged playlists again"""
+    print("\nTest 13: Expired Misses")
+    print("-" * 50)
+    library = make_library(300, playlist_size=100)
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic(miss_rate=0.2)
+    ttl_days = migrator.NO_RESULTS_TTL_DAYS
+    migrator.NO_RESULTS_TTL_DAYS = 0
+    try:
+        run_migration(sp, yt)
+        yt.miss_rate = 0.0
+        yt.calls.clear()
+        run_migration(sp, yt)
+    finally:
+        migrator.NO_RESULTS_TTL_DAYS = ttl_days
+    searches = yt.calls["search"]
+
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    for pl in library["playlists"]:
+        expected = expected_video_ids(yt, library["playlist_tracks"][pl["id"]])
+        if sorted(by_title.get(pl["name"], [])) != sorted(expected):
+            print(f"✗ FAILED: playlist '{pl['name']}' was skipped with expired misses")
+            return False
+    print(f"✓ SUCCESS: {searches} expired misses searched again without --retry-failed")
+    return True
+
+
+@in_temp_dir
+def test_large_playlist_uses_the_mirror():
+    """Test 14: A changed playlist of 1,000+ tracks is diffed against the local mirror"""
+    print("\nTest 14: Large Playlist Mirror")
+    print("-" * 50)
+    library = make_library(1500, playlist_size=1100, liked_share=0.0, overlap=0.0)
+    first = library["playlists"][0]
+    sp = FakeSpotify(library)
+    yt = FakeYTMusic()
+    run_migration(sp, yt)
+    # One more song on Spotify: a new snapshot, so the playlist is merged again
+    library["playlist_tracks"][first["id"]].append(make_track(99999))
+    first["snapshot_id"] = f"{first['id']}-snap2"
+    yt.calls.clear()
+    run_migration(sp, yt)
+    reads = yt.calls["get_playlist"]
+
+    by_title = {pl["title"]: pl["tracks"] for pl in yt.playlists.values()}
+    if by_title.get(first["name"]) != expected_video_ids(yt, library["playlist_tracks"][first["id"]]):
+        print(f"✗ FAILED: playlist '{first['name']}' does not match")
+        return False
+    if reads:
+        print(f"✗ FAILED: {reads} get_playlist calls for a playlist the mirror knows")
+        return False
+    print(f"✓ SUCCESS: {len(by_title[first['name']])}-track playlist merged without reading it back")
+    return True
+
+
+if __name__ == "__main__":
+    print("=" * 50)
+    print("Offline Migration Tests")
+    print("=" * 50)
+
+    results = []
+    for name, test in (
+        ("Full Migration", test_full_migration),
+        ("Incremental Re-run", test_rerun_is_incremental),
+        ("Throttling Recovery", test_throttling_recovers),
+        ("Retry Failed Songs", test_retry_failed),
+        ("Interrupt and Resume", test_interrupt_and_resume),
+        ("Rejected Adds", test_rejected_adds_are_isolated),
+        ("Run Budget", test_budget_queues_the_rest),
+        ("Title Variants", test_title_variants_share_a_search),
+        ("Concurrent Duplicates", test_concurrent_lookups_share_a_search),
+        ("Rejected Adds (Failed Status)", test_failed_status_is_a_rejection),
+        ("Create Timeout", test_create_timeout_does_not_duplicate),
+        ("Corrupt State", test_corrupt_state_starts_fresh),
+        ("Expired Misses", test_expired_misses_rerun_unchanged_playlists),
+        ("Large Playlist Mirror", test_large_playlist_uses_the_mirror),
+    ):
+        try:
+            test()
+            results.append((name, True))
+        except AssertionError:
+            results.append((name, False))
+
+    # Summary
+    print("\n" + "=" * 50)
+    print("Test Summary")
+    print("=" * 50)
+    for test_name, passed in results:
+        status = "✓ PASS" if passed else "✗ FAIL"
+        print(f"{status}: {test_name}")
+
+    if all(result[1] for result in results):
+        print("\n✓ All tests passed!")
+    else:
+        print("\n✗ Some tests failed. Check the errors above.")
+        raise SystemExit(1)